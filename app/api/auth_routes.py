@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Request
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Query
+from fastapi.security import HTTPAuthorizationCredentials
+from datetime import timedelta
 from bson import ObjectId
-from app.database import get_users_collection, get_predictions_collection
+from pymongo.errors import DuplicateKeyError
+from app.database import get_users_collection, get_predictions_collection, utc_now
 from app.schemas.auth import UserCreate, UserLogin, UserResponse, Token
 from app.auth import (
     get_password_hash, 
     verify_password, 
     create_access_token, 
     get_current_user,
+    revoke_token,
+    security,
+    DUMMY_PASSWORD_HASH,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.limiter import limiter
@@ -30,34 +35,31 @@ async def register(request: Request, user_data: UserCreate):
     """
     users_collection = get_users_collection()
     
-    # Check if email already exists
-    existing_user = await users_collection.find_one({"email": user_data.email})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Check if username already exists
-    existing_username = await users_collection.find_one({"username": user_data.username})
-    if existing_username:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
-        )
-    
     # Create new user
+    now = utc_now()
     new_user = {
         "email": user_data.email,
         "username": user_data.username,
         "full_name": user_data.full_name,
         "hashed_password": get_password_hash(user_data.password),
         "is_active": True,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
+        "created_at": now,
+        "updated_at": now
     }
     
-    result = await users_collection.insert_one(new_user)
+    # Unique indexes on email/username reject duplicates in the same round-trip
+    try:
+        result = await users_collection.insert_one(new_user)
+    except DuplicateKeyError as e:
+        key_pattern = (e.details or {}).get("keyPattern", {})
+        if "username" in key_pattern:
+            detail = "Username already taken"
+        else:
+            detail = "Email already registered"
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
     user_id = str(result.inserted_id)
     logger.info("[register] New user: id=%s | username=%s | email=%s", user_id, user_data.username, user_data.email)
     
@@ -96,6 +98,8 @@ async def login(request: Request, credentials: UserLogin):
     user = await users_collection.find_one({"email": credentials.email})
     
     if not user:
+        # Burn one bcrypt verify anyway so unknown emails are not faster to reject
+        verify_password(credentials.password, DUMMY_PASSWORD_HASH)
         logger.warning("[login] FAILED (unknown email) | email=%s", credentials.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -148,7 +152,7 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     Requires valid JWT token in Authorization header.
     """
     return UserResponse(
-        id=str(current_user["_id"]),
+        id=current_user["_id_str"],
         email=current_user["email"],
         username=current_user["username"],
         full_name=current_user.get("full_name"),
@@ -159,7 +163,7 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 
 @router.get("/history")
 async def get_prediction_history(
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=100),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -167,16 +171,17 @@ async def get_prediction_history(
     Returns the last N predictions made by the user.
     """
     predictions_collection = get_predictions_collection()
-    user_id = str(current_user["_id"])
+    user_id = current_user["_id_str"]
     
+    # Only the fields the history view renders; batch_size == limit returns one batch
     cursor = predictions_collection.find(
-        {"user_id": user_id}
-    ).sort("created_at", -1).limit(limit)
+        {"user_id": user_id},
+        {"text": 1, "prediction": 1, "confidence": 1, "is_fake": 1, "from_image": 1, "created_at": 1}
+    ).sort("created_at", -1).limit(limit).batch_size(limit)
     
-    predictions = []
-    async for prediction in cursor:
+    predictions = await cursor.to_list(length=limit)
+    for prediction in predictions:
         prediction["_id"] = str(prediction["_id"])
-        predictions.append(prediction)
     
     return {"predictions": predictions, "count": len(predictions)}
 
@@ -188,22 +193,22 @@ async def get_user_stats(current_user: dict = Depends(get_current_user)):
     Returns total checks, real count, and fake count.
     """
     predictions_collection = get_predictions_collection()
-    user_id = str(current_user["_id"])
-    
-    # Count total predictions
-    total_checks = await predictions_collection.count_documents({"user_id": user_id})
-    
-    # Count real predictions
-    real_count = await predictions_collection.count_documents({
-        "user_id": user_id,
-        "is_fake": False
-    })
-    
-    # Count fake predictions
-    fake_count = await predictions_collection.count_documents({
-        "user_id": user_id,
-        "is_fake": True
-    })
+    user_id = current_user["_id_str"]
+    
+    # Single aggregation round-trip: count predictions grouped by is_fake
+    cursor = predictions_collection.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": "$is_fake", "n": {"$sum": 1}}}
+    ])
+    
+    real_count = 0
+    fake_count = 0
+    async for doc in cursor:
+        if doc["_id"] is True:
+            fake_count = doc["n"]
+        elif doc["_id"] is False:
+            real_count = doc["n"]
+    total_checks = fake_count + real_count
     
     return {
         "total_checks": total_checks,
@@ -213,9 +218,15 @@ async def get_user_stats(current_user: dict = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout(current_user: dict = Depends(get_current_user)):
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user)
+):
     """
     Logout current user (client should discard the token).
+    The token is also revoked in this worker process (best-effort: other
+    workers keep accepting it until it expires).
     """
-    logger.info("[logout] user=%s | username=%s", str(current_user["_id"]), current_user.get("username"))
+    revoke_token(credentials.credentials)
+    logger.info("[logout] user=%s | username=%s", current_user["_id_str"], current_user.get("username"))
     return {"message": "Successfully logged out"}
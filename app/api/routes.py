@@ -1,19 +1,45 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Request
-from datetime import datetime
+from fastapi.responses import ORJSONResponse
 from app.schemas.prediction import PredictionRequest, PredictionResponse, ImagePredictionRequest, ImageExtractionResponse
-from app.models.bert_model import get_model, predict_fake_news
+from app.models.bert_model import predict_fake_news, predict_fake_news_batch, run_inference
 from app.utils.ai_verification import ai_checker
+from app.utils.claim_features import ClaimFeatures
 from app.utils.news_validator import news_validator
 from app.utils.image_ocr import image_ocr
 from app.auth import get_current_user
-from app.database import get_predictions_collection
+from app.database import enqueue_prediction, utc_now
 from app.limiter import limiter
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter()
 
-@router.post("/predict", response_model=PredictionResponse)
+# PredictionResponse fields and defaults. /predict returns exactly these keys, as
+# response_model filtering did, without a Pydantic validation pass per call
+_PREDICTION_RESPONSE_DEFAULTS = {
+    name: None if field.is_required() else field.default
+    for name, field in PredictionResponse.model_fields.items()
+}
+
+
+def _prediction_payload(result: dict) -> dict:
+    """Project an internal result dict onto the PredictionResponse contract."""
+    payload = {name: result.get(name, default) for name, default in _PREDICTION_RESPONSE_DEFAULTS.items()}
+    # The one constraint the response model enforced on values
+    if not 0 <= payload["confidence"] <= 1:
+        raise ValueError(f"confidence out of range: {payload['confidence']}")
+    return payload
+
+
+async def _bert_predict(formatted_input: str) -> dict:
+    """Run the BERT fallback on the bounded inference pool so the event loop stays free."""
+    # The model is resolved on the inference thread: loading it takes a lock
+    # that the startup warmup holds, which must not block the event loop
+    return await run_inference(predict_fake_news, formatted_input)
+
+
+@router.post("/predict", response_model=None, responses={200: {"model": PredictionResponse}})
 @limiter.limit("30/minute")
 async def predict(
     request: Request,
@@ -32,11 +58,24 @@ async def predict(
         PredictionResponse with prediction label, confidence, and probabilities
     """
     try:
-        user_id = str(current_user["_id"])
+        user_id = current_user["_id_str"]
         logger.info("[predict] user=%s | title='%.80s'", user_id, body.title)
 
+        if body.text:
+            formatted_input = f"{body.title} [SEP] {body.text}"
+        else:
+            formatted_input = f"{body.title} [SEP] {body.title}"
+
+        # Tokenize/extract keywords once; shared by news search and Gemini
+        claim = ClaimFeatures.from_text(body.title)
+
         # ── STEP 1: NewsAPI / Google News search (real-world evidence) ────────
-        news_validation = news_validator.validate_claim(body.title)
+        news_task = asyncio.create_task(news_validator.validate_claim(claim))
+        # Gemini needs the news articles, but when it is disabled BERT is the
+        # only predictor and can run while the news search is in flight
+        bert_task = None if ai_checker.enabled else asyncio.create_task(_bert_predict(formatted_input))
+
+        news_validation = await news_task
         logger.info(
             "[predict] news_validation status=%s relevant=%d",
             news_validation.get("verification_status", "n/a") if news_validation else "n/a",
@@ -46,7 +85,7 @@ async def predict(
         # ── STEP 2: Gemini AI — PRIMARY predictor (with news context) ─────────
         # Pass the fetched articles so Gemini reads actual content, not just headlines
         news_articles = news_validation.get("articles", []) if news_validation else []
-        ai_result = ai_checker.predict_with_context(body.title, news_articles=news_articles)
+        ai_result = await ai_checker.apredict_with_context(claim, news_articles=news_articles)
 
         if ai_result:
             # Gemini succeeded → use it as the primary result
@@ -72,13 +111,10 @@ async def predict(
             # ── STEP 3: BERT — FALLBACK (only when Gemini is unavailable) ────
             logger.info("[predict] Gemini unavailable — falling back to BERT")
 
-            if body.text:
-                formatted_input = f"{body.title} [SEP] {body.text}"
+            if bert_task is not None:
+                bert_result = await bert_task
             else:
-                formatted_input = f"{body.title} [SEP] {body.title}"
-
-            model, tokenizer, checkpoint = get_model()
-            bert_result = predict_fake_news(formatted_input, model, tokenizer, checkpoint)
+                bert_result = await _bert_predict(formatted_input)
             bert_result["text"] = body.title
 
             final_result = {
@@ -97,16 +133,16 @@ async def predict(
         final_result = news_validator.enhance_prediction(final_result, ai_result, news_validation)
         
         # Save prediction to history
-        predictions_collection = get_predictions_collection()
         prediction_record = {
-            "user_id": str(current_user["_id"]),
+            "user_id": user_id,
             "text": body.title[:500],  # Store title
             "prediction": final_result["prediction"],
             "confidence": final_result["confidence"],
             "is_fake": final_result["is_fake"],
-            "created_at": datetime.utcnow()
+            "created_at": utc_now()
         }
-        await predictions_collection.insert_one(prediction_record)
+        # Queued; written in batches by the background history writer
+        enqueue_prediction(prediction_record)
 
         logger.info(
             "[predict] DONE user=%s | result=%s | confidence=%.2f | source=%s",
@@ -115,9 +151,10 @@ async def predict(
             final_result["confidence"],
             final_result.get("prediction_source", "unknown"),
         )
-        return final_result
+        # Internally built payload: project it onto the schema, serialize with orjson
+        return ORJSONResponse(_prediction_payload(final_result))
     except Exception as e:
-        logger.error("[predict] ERROR user=%s | %s", str(current_user.get("_id", "?")), e, exc_info=True)
+        logger.error("[predict] ERROR user=%s | %s", current_user.get("_id_str", "?"), e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 @router.post("/batch-predict")
@@ -141,20 +178,35 @@ async def batch_predict(
     try:
         if len(texts) > 10:
             raise HTTPException(status_code=422, detail="Max 10 items per batch request.")
-        user_id = str(current_user["_id"])
+        user_id = current_user["_id_str"]
         logger.info("[batch-predict] user=%s | count=%d", user_id, len(texts))
-        model, tokenizer, checkpoint = get_model()
         results = []
-        predictions_collection = get_predictions_collection()
-        
-        for text in texts:
+
+        async def gather_evidence(text: str):
+            claim = ClaimFeatures.from_text(text)
+
             # ── STEP 1: NewsAPI / Google News ─────────────────────────────────
-            news_validation = news_validator.validate_claim(text)
+            news_validation = await news_validator.validate_claim(claim)
 
             # ── STEP 2: Gemini AI — PRIMARY (with news context) ───────────────
             news_articles = news_validation.get("articles", []) if news_validation else []
-            ai_result = ai_checker.predict_with_context(text, news_articles=news_articles)
+            ai_result = await ai_checker.apredict_with_context(claim, news_articles=news_articles)
+            return news_validation, ai_result
+
+        # News search + Gemini for every text run concurrently
+        evidence = await asyncio.gather(*(gather_evidence(text) for text in texts))
 
+        # ── STEP 3: BERT — FALLBACK, one batched forward pass for all misses ──
+        fallback_texts = [text for text, (_, ai_result) in zip(texts, evidence) if not ai_result]
+        bert_results = iter([])
+        if fallback_texts:
+            bert_results = iter(await run_inference(
+                predict_fake_news_batch,
+                [f"{text} [SEP] {text}" for text in fallback_texts]
+            ))
+
+        now = utc_now()
+        for text, (news_validation, ai_result) in zip(texts, evidence):
             if ai_result:
                 final_result = {
                     "text": text,
@@ -169,9 +221,7 @@ async def batch_predict(
                 if news_validation and news_validation.get("relevant_articles", 0) >= 2:
                     final_result["confidence"] = min(0.98, final_result["confidence"] + 0.05)
             else:
-                # ── STEP 3: BERT — FALLBACK ────────────────────────────────────
-                formatted_input = f"{text} [SEP] {text}"
-                bert_result = predict_fake_news(formatted_input, model, tokenizer, checkpoint)
+                bert_result = next(bert_results)
                 bert_result["text"] = text
                 final_result = {
                     **bert_result,
@@ -186,19 +236,19 @@ async def batch_predict(
             
             # Save to history
             prediction_record = {
-                "user_id": str(current_user["_id"]),
+                "user_id": user_id,
                 "text": text[:500],
                 "prediction": final_result["prediction"],
                 "confidence": final_result["confidence"],
                 "is_fake": final_result["is_fake"],
-                "created_at": datetime.utcnow()
+                "created_at": now
             }
-            await predictions_collection.insert_one(prediction_record)
+            enqueue_prediction(prediction_record)
         
         logger.info("[batch-predict] DONE user=%s | processed=%d", user_id, len(results))
         return {"predictions": results}
     except Exception as e:
-        logger.error("[batch-predict] ERROR user=%s | %s", str(current_user.get("_id", "?")), e, exc_info=True)
+        logger.error("[batch-predict] ERROR user=%s | %s", current_user.get("_id_str", "?"), e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
 
 
@@ -220,7 +270,7 @@ async def image_predict(
         Dict with extracted text and prediction results
     """
     try:
-        user_id = str(current_user["_id"])
+        user_id = current_user["_id_str"]
         logger.info("[image-predict] user=%s | mime=%s", user_id, body.mime_type)
         # Step 1: Extract text from image using OCR
         if not image_ocr.enabled:
@@ -244,8 +294,17 @@ async def image_predict(
             else:
                 raise HTTPException(status_code=400, detail="No readable text found in image.")
         
+        if text and text != "NOT_FOUND":
+            formatted_input = f"{title} [SEP] {text}"
+        else:
+            formatted_input = f"{title} [SEP] {title}"
+
         # Step 2: News search (same as text pipeline — Gemini needs this context)
-        news_validation = news_validator.validate_claim(title)
+        claim = ClaimFeatures.from_text(title)
+        news_task = asyncio.create_task(news_validator.validate_claim(claim))
+        bert_task = None if ai_checker.enabled else asyncio.create_task(_bert_predict(formatted_input))
+
+        news_validation = await news_task
         logger.info(
             "[image-predict] news_validation status=%s relevant=%d",
             news_validation.get("verification_status", "n/a") if news_validation else "n/a",
@@ -254,7 +313,7 @@ async def image_predict(
         news_articles = news_validation.get("articles", []) if news_validation else []
 
         # Step 3: Gemini AI — PRIMARY (with news context, identical to text pipeline)
-        ai_result = ai_checker.predict_with_context(title, news_articles=news_articles)
+        ai_result = await ai_checker.apredict_with_context(claim, news_articles=news_articles)
 
         if ai_result:
             final_result = {
@@ -278,12 +337,10 @@ async def image_predict(
         else:
             # Step 4: BERT — FALLBACK (only when Gemini is unavailable)
             logger.info("[image-predict] Gemini unavailable — falling back to BERT")
-            if text and text != "NOT_FOUND":
-                formatted_input = f"{title} [SEP] {text}"
+            if bert_task is not None:
+                bert_result = await bert_task
             else:
-                formatted_input = f"{title} [SEP] {title}"
-            model, tokenizer, checkpoint = get_model()
-            bert_result = predict_fake_news(formatted_input, model, tokenizer, checkpoint)
+                bert_result = await _bert_predict(formatted_input)
             bert_result["text"] = title
             final_result = {
                 **bert_result,
@@ -305,17 +362,16 @@ async def image_predict(
         }
         
         # Save to history
-        predictions_collection = get_predictions_collection()
         prediction_record = {
-            "user_id": str(current_user["_id"]),
+            "user_id": user_id,
             "text": title[:500],
             "prediction": final_result["prediction"],
             "confidence": final_result["confidence"],
             "is_fake": final_result["is_fake"],
             "from_image": True,
-            "created_at": datetime.utcnow()
+            "created_at": utc_now()
         }
-        await predictions_collection.insert_one(prediction_record)
+        enqueue_prediction(prediction_record)
 
         logger.info(
             "[image-predict] DONE user=%s | title='%.60s' | result=%s | confidence=%.2f",
@@ -328,7 +384,7 @@ async def image_predict(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error("[image-predict] ERROR user=%s | %s", str(current_user.get("_id", "?")), e, exc_info=True)
+        logger.error("[image-predict] ERROR user=%s | %s", current_user.get("_id_str", "?"), e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Image prediction error: {str(e)}")
 
 
@@ -1,24 +1,50 @@
 import os
+import secrets
+import time
 import bcrypt
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional
 from jose import JWTError, jwt
+from cachetools import TLRUCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from dotenv import load_dotenv
-from app.database import get_users_collection
+from app.utils.env import load_env
+from app.database import get_users_collection, utc_now
 from app.schemas.auth import TokenData
+from app.utils.logger import get_logger
 
-load_dotenv()
+load_env()
+
+logger = get_logger(__name__)
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-super-secret-jwt-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 hours
 
+# bcrypt work factor, pinned so a library default change cannot silently move login cost
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 # Security scheme
 security = HTTPBearer()
 
+# Verified bearer token -> (user document, token exp). Repeat requests with the
+# same token skip the JWT decode and the Mongo lookup for USER_CACHE_TTL_SECONDS,
+# but never past the token's own expiry, since a hit skips the exp check.
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+
+
+def _user_cache_ttu(_token, entry, now):
+    return min(now + USER_CACHE_TTL_SECONDS, entry[1])
+
+
+_user_cache = TLRUCache(maxsize=10_000, ttu=_user_cache_ttu, timer=time.time)
+
+# Tokens revoked by /auth/logout -> their exp. A plain dict rather than a
+# size-bounded cache, so a revocation is never evicted early; entries are
+# dropped once the token has expired anyway. Held per process only.
+_revoked_tokens: dict = {}
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -27,16 +53,23 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+# Verified against when a login email is unknown, so "no such user" costs the
+# same bcrypt work as "wrong password" and response timing does not leak which.
+_hash_start = time.perf_counter()
+DUMMY_PASSWORD_HASH = get_password_hash(secrets.token_urlsafe(16))
+logger.info("bcrypt rounds=%d | hash time=%.0fms", BCRYPT_ROUNDS, (time.perf_counter() - _hash_start) * 1000)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = utc_now() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = utc_now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -50,7 +83,7 @@ def decode_token(token: str) -> Optional[TokenData]:
         email: str = payload.get("email")
         if user_id is None:
             return None
-        return TokenData(user_id=user_id, email=email)
+        return TokenData(user_id=user_id, email=email, exp=payload.get("exp"))
     except JWTError:
         return None
 
@@ -64,22 +97,33 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     )
     
     token = credentials.credentials
-    token_data = decode_token(token)
-    
-    if token_data is None:
-        raise credentials_exception
-    
-    # Get user from database
-    users_collection = get_users_collection()
-    from bson import ObjectId
-    
-    try:
-        user = await users_collection.find_one({"_id": ObjectId(token_data.user_id)})
-    except:
+    if token in _revoked_tokens:
         raise credentials_exception
     
+    entry = _user_cache.get(token)
+    user = entry[0] if entry is not None else None
     if user is None:
-        raise credentials_exception
+        token_data = decode_token(token)
+        
+        if token_data is None:
+            raise credentials_exception
+        
+        # Get user from database
+        users_collection = get_users_collection()
+        from bson import ObjectId
+        
+        try:
+            user = await users_collection.find_one({"_id": ObjectId(token_data.user_id)})
+        except:
+            raise credentials_exception
+        
+        if user is None:
+            raise credentials_exception
+        
+        # Converted once here; endpoints read _id_str instead of str(user["_id"])
+        user["_id_str"] = str(user["_id"])
+        if token_data.exp is not None:
+            _user_cache[token] = (user, token_data.exp)
     
     if not user.get("is_active", True):
         raise HTTPException(
@@ -88,3 +132,19 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
     
     return user
+
+
+def revoke_token(token: str) -> None:
+    """
+    Drop a token from the user cache and reject it in this process for the
+    rest of its lifetime. Best-effort: the deny-list is not shared, so other
+    workers (and this one after a restart) accept the token until it expires.
+    """
+    _user_cache.pop(token, None)
+    now = time.time()
+    for revoked, exp in list(_revoked_tokens.items()):
+        if exp <= now:
+            del _revoked_tokens[revoked]
+    token_data = decode_token(token)
+    exp = token_data.exp if token_data and token_data.exp else now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    _revoked_tokens[token] = exp
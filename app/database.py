@@ -1,32 +1,85 @@
 import os
+import asyncio
+from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
+from app.utils.env import load_env
 
-load_dotenv()
+load_env()
 
 # MongoDB connection settings
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "fake_news_detector")
 
-# Global database client
+# Connection pool per worker process. Keep maxPoolSize <= mongo_max_connections / num_workers
+# so several uvicorn workers cannot exhaust the server's connection limit.
+MONGO_MAX_POOL = int(os.getenv("MONGO_MAX_POOL", "20"))
+MONGO_MIN_POOL = int(os.getenv("MONGO_MIN_POOL", "2"))
+# Wire compression, in order of preference. zstd and snappy need the pymongo[zstd,snappy]
+# extras (installed by default); without them PyMongo warns and falls back to zlib
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+
+# Prediction history writes are queued and flushed in batches by a background
+# task: a flush happens every HISTORY_FLUSH_MAX_RECORDS records or after
+# HISTORY_FLUSH_INTERVAL_SECONDS, whichever comes first.
+HISTORY_FLUSH_MAX_RECORDS = 100
+HISTORY_FLUSH_INTERVAL_SECONDS = 0.2
+HISTORY_QUEUE_MAX_SIZE = 10_000
+
+# Global database client, created once per process and shared by all requests
 client: AsyncIOMotorClient = None
 db = None
 
+# Background history writer state
+_history_queue: asyncio.Queue = None
+_history_task: asyncio.Task = None
+
 
 async def connect_to_mongodb():
     """Connect to MongoDB database"""
     global client, db
     try:
-        client = AsyncIOMotorClient(MONGODB_URL)
+        client = AsyncIOMotorClient(
+            MONGODB_URL,
+            maxPoolSize=MONGO_MAX_POOL,
+            minPoolSize=MONGO_MIN_POOL,
+            serverSelectionTimeoutMS=3000,
+            compressors=MONGO_COMPRESSORS,
+            retryWrites=True,
+        )
         db = client[DATABASE_NAME]
         # Verify connection
         await client.admin.command('ping')
         print(f"✅ Connected to MongoDB: {DATABASE_NAME}")
+        await ensure_indexes()
     except Exception as e:
         print(f"❌ Failed to connect to MongoDB: {e}")
         raise e
 
 
+async def ensure_indexes():
+    """
+    Create the indexes the API queries rely on (no-op if they already exist).
+    The unique user indexes are required: /auth/register depends on them to
+    reject duplicates, so failing to create them fails startup. The
+    prediction indexes only speed up queries and are best-effort.
+    """
+    try:
+        # /auth/history: a user's predictions, newest first
+        await db["predictions"].create_index([("user_id", 1), ("created_at", -1)])
+        # /auth/stats groups a user's predictions by is_fake
+        await db["predictions"].create_index([("user_id", 1), ("is_fake", 1)])
+    except Exception as e:
+        print(f"⚠ Failed to create MongoDB prediction indexes: {e}")
+    
+    # /auth/register relies on these to reject duplicates on insert
+    try:
+        await db["users"].create_index("email", unique=True)
+        await db["users"].create_index("username", unique=True)
+    except Exception as e:
+        print(f"❌ Failed to create unique user indexes (duplicate users in the collection?): {e}")
+        raise
+
+
 async def close_mongodb_connection():
     """Close MongoDB connection"""
     global client
@@ -35,6 +88,63 @@ async def close_mongodb_connection():
         print("MongoDB connection closed")
 
 
+def start_history_writer():
+    """Start the background task that batches prediction history inserts"""
+    global _history_queue, _history_task
+    _history_queue = asyncio.Queue(maxsize=HISTORY_QUEUE_MAX_SIZE)
+    _history_task = asyncio.create_task(_flush_history())
+
+
+async def stop_history_writer():
+    """Flush whatever is still queued and stop the background writer"""
+    global _history_task
+    if _history_task is None:
+        return
+    await _history_queue.put(None)  # sentinel: flush and exit
+    await _history_task
+    _history_task = None
+
+
+def enqueue_prediction(record: dict):
+    """Queue a prediction history record; the response never waits on the write"""
+    try:
+        _history_queue.put_nowait(record)
+    except asyncio.QueueFull:
+        print("⚠ Prediction history queue full, dropping record")
+
+
+async def _flush_history():
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        record = await _history_queue.get()
+        if record is None:
+            break
+        batch = [record]
+        deadline = loop.time() + HISTORY_FLUSH_INTERVAL_SECONDS
+        while len(batch) < HISTORY_FLUSH_MAX_RECORDS:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                record = await asyncio.wait_for(_history_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if record is None:
+                stopping = True
+                break
+            batch.append(record)
+        try:
+            await get_predictions_collection().insert_many(batch, ordered=False)
+        except Exception as e:
+            print(f"❌ Failed to write {len(batch)} prediction history records: {e}")
+
+
+def utc_now() -> datetime:
+    """Timezone-aware current UTC time (datetime.utcnow() is deprecated)"""
+    return datetime.now(timezone.utc)
+
+
 def get_database():
     """Get database instance"""
     return db
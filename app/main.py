@@ -1,26 +1,61 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.api import routes, auth_routes
-from app.database import connect_to_mongodb, close_mongodb_connection
+from app.database import (
+    connect_to_mongodb,
+    close_mongodb_connection,
+    start_history_writer,
+    stop_history_writer,
+)
 from app.limiter import limiter
+from app.models.bert_model import run_inference, warmup_model
 from app.utils.logger import get_logger
+from app.utils.news_validator import news_validator
 
 logger = get_logger(__name__)
 
+# Worker threads for blocking I/O calls offloaded from request handlers
+IO_THREAD_WORKERS = int(os.getenv("IO_THREAD_WORKERS", "32"))
+
+
+async def _warmup_model(app: FastAPI):
+    """Load BERT and run one dummy prediction so the first real request is fast"""
+    try:
+        await run_inference(warmup_model)
+        app.state.model_ready = True
+        logger.info("BERT model warmed up. API is ready.")
+    except Exception as e:
+        logger.error("BERT warmup failed | %s", e, exc_info=True)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Manage application lifecycle - connect/disconnect from MongoDB"""
+    """Manage application lifecycle - connect/disconnect from MongoDB, load the BERT model"""
     logger.info("Starting up TruthLens API...")
+    # Bounded pool for blocking calls run via asyncio.to_thread; BERT forwards
+    # and news parsing use their own pools (bert_model, news_validator)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=IO_THREAD_WORKERS, thread_name_prefix="io")
+    )
     await connect_to_mongodb()
-    logger.info("MongoDB connected. API is ready.")
+    start_history_writer()
+    logger.info("MongoDB connected.")
+    # Load + warm BERT in the background; /ready reports 503 until it is done
+    app.state.model_ready = False
+    warmup_task = asyncio.create_task(_warmup_model(app))
     yield
     logger.info("Shutting down TruthLens API...")
+    warmup_task.cancel()
+    await stop_history_writer()
+    await news_validator.aclose()
     await close_mongodb_connection()
     logger.info("MongoDB disconnected. Goodbye.")
 
@@ -29,7 +64,8 @@ app = FastAPI(
     title="Fake News Detection API",
     description="API for detecting fake news using fine-tuned BERT model with user authentication",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Attach rate limiter
@@ -82,3 +118,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness probe: 503 until the BERT model has been loaded and warmed up"""
+    if not getattr(request.app.state, "model_ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
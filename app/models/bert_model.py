@@ -1,8 +1,53 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import torch
 import torch.nn as nn
+from cachetools import TTLCache
+from app.utils.env import load_env
 from transformers import BertTokenizer, BertModel
 from pathlib import Path
-from functools import lru_cache
+from functools import lru_cache, partial
+
+load_env()
+
+# Finished predictions keyed by input text, so repeated claims skip the forward pass
+PREDICTION_CACHE_TTL_SECONDS = int(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+_prediction_cache = TTLCache(maxsize=2048, ttl=PREDICTION_CACHE_TTL_SECONDS)
+_prediction_cache_lock = threading.Lock()
+
+if torch.cuda.is_available():
+    # Allow TF32 tensor-core matmuls for anything still running in FP32
+    torch.set_float32_matmul_precision('high')
+
+# Dedicated pool for model forwards, sized to what the hardware can run at once:
+# one worker on GPU (the device is the bottleneck), at most two on CPU.
+# Keeps heavy inference off the event loop and off the shared I/O thread pool.
+_CPU_CORES = os.cpu_count() or 1
+INFERENCE_WORKERS = int(os.getenv(
+    'INFERENCE_WORKERS',
+    '1' if torch.cuda.is_available() else str(min(2, _CPU_CORES))
+))
+_inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix='bert-inference')
+
+if not torch.cuda.is_available() and 'OMP_NUM_THREADS' not in os.environ:
+    # Each CPU forward already fans out over torch's intra-op threads; split the
+    # cores between concurrent forwards instead of giving every one all of them
+    torch.set_num_threads(max(1, _CPU_CORES // INFERENCE_WORKERS))
+
+# Compile the model with torch.compile at load time (falls back to eager on failure).
+# On by default only with a single inference worker: Dynamo is not thread-safe,
+# and concurrent forwards can trigger recompiles at request time.
+ENABLE_TORCH_COMPILE = os.getenv(
+    'ENABLE_TORCH_COMPILE', 'true' if INFERENCE_WORKERS == 1 else 'false'
+).lower() == 'true'
+# Set once a compiled forward fails; every later call uses the eager module
+_compile_failed = False
+
+# Tokenizers used by _tokenize_cached, keyed by id() so the LRU key stays a plain int
+_tokenizers = {}
 
 class EnhancedBertForSequenceClassification(nn.Module):
     def __init__(self, model_name='bert-base-uncased', num_classes=2, dropout=0.3):
@@ -74,7 +119,11 @@ class EnhancedBertForSequenceClassification(nn.Module):
 
         return logits
 
-@lru_cache(maxsize=1)
+# Serializes the first load so a request racing the startup warmup waits for it
+# instead of loading a second copy of the weights
+_model_lock = threading.Lock()
+
+
 def get_model():
     """
     Load the fine-tuned BERT model and tokenizer.
@@ -83,6 +132,12 @@ def get_model():
     Returns:
         tuple: (model, tokenizer, checkpoint_info)
     """
+    with _model_lock:
+        return _load_model()
+
+
+@lru_cache(maxsize=1)
+def _load_model():
     model_path = Path(__file__).parent.parent.parent / "enhanced_bert_welfake_model"
     
     # Load tokenizer
@@ -114,8 +169,193 @@ def get_model():
     model.to(device)
     model.eval()
     
+    if device.type == 'cuda':
+        # FP16 weights halve memory traffic and run matmuls on tensor cores
+        model.half()
+    # Per-process constants, resolved once instead of on every prediction
+    model._inference_cfg = _build_inference_config(checkpoint, device)
+    model = _maybe_compile(model, tokenizer, device)
+    
     return model, tokenizer, checkpoint
 
+
+@contextmanager
+def _inference_context(device: torch.device):
+    """No autograd bookkeeping, plus FP16 autocast on GPU."""
+    cuda = device.type == 'cuda'
+    with torch.inference_mode(), torch.autocast(
+        device_type=device.type,
+        dtype=torch.float16 if cuda else torch.bfloat16,
+        enabled=cuda
+    ):
+        yield
+
+
+def _maybe_compile(model, tokenizer, device: torch.device):
+    """
+    Wrap the model with torch.compile. Compilation is lazy, so one dummy
+    forward runs here to pay the trace cost at load time and to surface
+    backend errors before a real request does; on any failure the eager
+    model is returned unchanged.
+    """
+    if not ENABLE_TORCH_COMPILE or not hasattr(torch, 'compile'):
+        return model
+    try:
+        compiled = torch.compile(model, dynamic=True, fullgraph=False)
+        encoding = tokenizer("warmup [SEP] warmup", return_tensors='pt')
+        with _inference_context(device):
+            compiled(encoding['input_ids'].to(device), encoding['attention_mask'].to(device))
+        print("✓ BERT model compiled with torch.compile")
+        return compiled
+    except Exception as e:
+        print(f"⚠ torch.compile failed, using eager BERT model: {e}")
+        return model
+
+
+def _forward(model, input_ids, attention_mask):
+    """
+    Run the model. If a compiled model fails at request time (e.g. a
+    recompile for a new shape), retry eagerly and stop using the compiled one.
+    """
+    global _compile_failed
+    eager = getattr(model, '_orig_mod', None)
+    if eager is None:
+        return model(input_ids, attention_mask)
+    if _compile_failed:
+        return eager(input_ids, attention_mask)
+    try:
+        return model(input_ids, attention_mask)
+    except Exception as e:
+        _compile_failed = True
+        print(f"⚠ Compiled BERT forward failed, falling back to eager: {e}")
+        return eager(input_ids, attention_mask)
+
+def _get_labels(num_classes: int, classification_type: str) -> list:
+    """
+    Build the class-index -> label list for a checkpoint.
+
+    NOTE: WELFake dataset uses:
+    0 = real (legitimate news)
+    1 = fake (fake/misleading news)
+    """
+    if classification_type == 'binary' and num_classes == 2:
+        return ["real", "fake"]
+    elif num_classes == 6:
+        return ["pants-fire", "false", "barely-true", "half-true", "mostly-true", "true"]
+    return [f"class_{i}" for i in range(num_classes)]
+
+
+def _build_inference_config(checkpoint, device: torch.device) -> dict:
+    """Resolve device, label list and classification metadata from checkpoint info."""
+    num_classes = checkpoint.get('num_classes', 2) if checkpoint else 2
+    classification_type = checkpoint.get('classification_type', 'binary') if checkpoint else 'binary'
+    if classification_type == 'binary':
+        # class 1 is "fake" in WELFake dataset
+        is_fake_table = [i == 1 for i in range(num_classes)]
+    else:
+        # pants-fire, false, barely-true are considered fake
+        is_fake_table = [i < 3 for i in range(num_classes)]
+    return {
+        "device": device,
+        "num_classes": num_classes,
+        "classification_type": classification_type,
+        "labels": _get_labels(num_classes, classification_type),
+        "is_fake_table": is_fake_table,
+    }
+
+
+def _get_inference_config(model, checkpoint) -> dict:
+    """Config precomputed by get_model, or built on the fly for a model loaded elsewhere."""
+    cfg = getattr(model, '_inference_cfg', None)
+    if cfg is None:
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        cfg = _build_inference_config(checkpoint, device)
+    return cfg
+
+
+def _format_input(text: str) -> str:
+    """
+    Format input to match training format: title [SEP] text.
+    If input doesn't have [SEP], treat the whole input as title + duplicate as text.
+    """
+    if '[SEP]' not in text:
+        # User passed only headline/claim - format it like training data
+        # Use the text as both title and content for better model understanding
+        return f"{text} [SEP] {text}"
+    return text
+
+
+@lru_cache(maxsize=2048)
+def _tokenize_cached(text: str, tokenizer_id: int):
+    """
+    Tokenize one formatted text. Returns CPU (input_ids, attention_mask)
+    tensors; callers move them to the model device.
+    """
+    # Pad to 512 as in training: the head's attention and max-pooling run
+    # over every position unmasked, so pad tokens affect the logits
+    encoding = _tokenizers[tokenizer_id](
+        text,
+        add_special_tokens=True,
+        max_length=512,
+        padding='max_length',
+        truncation=True,
+        return_tensors='pt'
+    )
+    return encoding['input_ids'], encoding['attention_mask']
+
+
+def _get_cached_prediction(text: str):
+    with _prediction_cache_lock:
+        result = _prediction_cache.get(text)
+    # Hand out copies; callers overwrite fields such as "text"
+    return _copy_result(result) if result is not None else None
+
+
+def _store_prediction(text: str, result: dict) -> dict:
+    with _prediction_cache_lock:
+        _prediction_cache[text] = result
+    return _copy_result(result)
+
+
+def _copy_result(result: dict) -> dict:
+    return {**result, "probabilities": dict(result["probabilities"])}
+
+
+def _class_probabilities(logits, num_classes: int) -> list:
+    """
+    Class probabilities for every row of logits, as Python lists (one device
+    sync). With two classes softmax reduces to a sigmoid of the logit
+    difference, which skips the full exp/normalize pass.
+    """
+    logits = logits.float()
+    if num_classes == 2:
+        fake_probs = torch.sigmoid(logits[:, 1] - logits[:, 0]).tolist()
+        return [[1.0 - p, p] for p in fake_probs]
+    return torch.softmax(logits, dim=1).tolist()
+
+
+def _build_result(text: str, probabilities: list, cfg: dict) -> dict:
+    """
+    Turn one row of class probabilities (a plain list from
+    _class_probabilities) into the prediction dict returned by the API.
+    """
+    labels = cfg["labels"]
+    predicted_class = max(range(len(probabilities)), key=probabilities.__getitem__)
+    confidence = probabilities[predicted_class]
+    
+    # Convert probabilities to dict
+    prob_dict = dict(zip(labels, probabilities))
+    
+    return {
+        "text": text,  # Return original text, not formatted
+        "prediction": labels[predicted_class],
+        "confidence": float(confidence),
+        "probabilities": prob_dict,
+        "is_fake": cfg["is_fake_table"][predicted_class],
+        "classification_type": cfg["classification_type"]
+    }
+
+
 def predict_fake_news(text: str, model=None, tokenizer=None, checkpoint=None):
     """
     Predict whether a news article is fake or real.
@@ -129,79 +369,100 @@ def predict_fake_news(text: str, model=None, tokenizer=None, checkpoint=None):
     Returns:
         dict: Prediction results with label, confidence, and probabilities
     """
+    cached = _get_cached_prediction(text)
+    if cached is not None:
+        return cached
+    
     if model is None or tokenizer is None:
         model, tokenizer, checkpoint = get_model()
     
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    cfg = _get_inference_config(model, checkpoint)
+    device = cfg["device"]
     
-    # Format input to match training format: title [SEP] text
-    # If input doesn't have [SEP], treat the whole input as title + duplicate as text
-    if '[SEP]' not in text:
-        # User passed only headline/claim - format it like training data
-        # Use the text as both title and content for better model understanding
-        formatted_text = f"{text} [SEP] {text}"
-    else:
-        formatted_text = text
+    formatted_text = _format_input(text)
     
-    # Determine classification type from checkpoint
-    num_classes = checkpoint.get('num_classes', 2) if checkpoint else 2
-    classification_type = checkpoint.get('classification_type', 'binary') if checkpoint else 'binary'
+    # Tokenize input (use formatted text); repeated texts hit the LRU
+    _tokenizers.setdefault(id(tokenizer), tokenizer)
+    input_ids, attention_mask = _tokenize_cached(formatted_text, id(tokenizer))
     
-    # Label mapping based on classification type
-    # NOTE: WELFake dataset uses:
-    # 0 = real (legitimate news)
-    # 1 = fake (fake/misleading news)
-    if classification_type == 'binary' and num_classes == 2:
-        labels = {
-            0: "real",
-            1: "fake"
-        }
-    elif num_classes == 6:
-        labels = {
-            0: "pants-fire",
-            1: "false",
-            2: "barely-true",
-            3: "half-true",
-            4: "mostly-true",
-            5: "true"
-        }
-    else:
-        labels = {i: f"class_{i}" for i in range(num_classes)}
+    input_ids = input_ids.to(device)
+    attention_mask = attention_mask.to(device)
     
-    # Tokenize input (use formatted text)
-    encoding = tokenizer(
-        formatted_text,
-        add_special_tokens=True,
-        max_length=512,
-        padding='max_length',
-        truncation=True,
-        return_tensors='pt'
-    )
+    # Make prediction
+    with _inference_context(device):
+        logits = _forward(model, input_ids, attention_mask)
+        probabilities = _class_probabilities(logits, cfg["num_classes"])
+    
+    result = _build_result(text, probabilities[0], cfg)
+    return _store_prediction(text, result)
+
+
+def predict_fake_news_batch(texts: list, model=None, tokenizer=None, checkpoint=None, batch_size: int = 16):
+    """
+    Predict a list of news articles with one tokenizer call and one forward
+    pass per mini-batch instead of one per text.
     
-    input_ids = encoding['input_ids'].to(device)
-    attention_mask = encoding['attention_mask'].to(device)
+    Args:
+        texts: News article texts (title only, or title [SEP] text format)
+        model: Pre-loaded model (optional)
+        tokenizer: Pre-loaded tokenizer (optional)
+        checkpoint: Model checkpoint with metadata (optional)
+        batch_size: Maximum number of texts per forward pass
+        
+    Returns:
+        list[dict]: One prediction dict per input text, in the same order
+    """
+    if not texts:
+        return []
+    if model is None or tokenizer is None:
+        model, tokenizer, checkpoint = get_model()
     
-    # Make prediction
-    with torch.no_grad():
-        logits = model(input_ids, attention_mask)
-        probabilities = torch.softmax(logits, dim=1)
-        predicted_class = torch.argmax(probabilities, dim=1).item()
-        confidence = probabilities[0][predicted_class].item()
+    cfg = _get_inference_config(model, checkpoint)
+    device = cfg["device"]
     
-    # Convert probabilities to dict
-    prob_dict = {labels[i]: float(probabilities[0][i].item()) for i in range(num_classes)}
+    # Only texts missing from the prediction cache go through the model
+    results = [_get_cached_prediction(text) for text in texts]
+    pending = [i for i, result in enumerate(results) if result is None]
     
-    # Determine if fake based on classification type
-    if classification_type == 'binary':
-        is_fake = predicted_class == 1  # class 1 is "fake" in WELFake dataset
-    else:
-        is_fake = predicted_class < 3  # pants-fire, false, barely-true are considered fake
+    for start in range(0, len(pending), batch_size):
+        indices = pending[start:start + batch_size]
+        
+        # Same 512 padding as predict_fake_news: the head is not length-agnostic,
+        # so padding to the longest text would make a score depend on its
+        # batch neighbours, and results share the prediction cache
+        encoding = tokenizer(
+            [_format_input(texts[i]) for i in indices],
+            add_special_tokens=True,
+            max_length=512,
+            padding='max_length',
+            truncation=True,
+            return_tensors='pt'
+        )
+        
+        input_ids = encoding['input_ids'].to(device)
+        attention_mask = encoding['attention_mask'].to(device)
+        
+        with _inference_context(device):
+            logits = _forward(model, input_ids, attention_mask)
+            probabilities = _class_probabilities(logits, cfg["num_classes"])
+        
+        for i, row in zip(indices, probabilities):
+            result = _build_result(texts[i], row, cfg)
+            results[i] = _store_prediction(texts[i], result)
     
-    return {
-        "text": text,  # Return original text, not formatted
-        "prediction": labels[predicted_class],
-        "confidence": float(confidence),
-        "probabilities": prob_dict,
-        "is_fake": is_fake,
-        "classification_type": classification_type
-    }
+    return results
+
+
+def warmup_model():
+    """
+    Load the model and run one prediction, so weight loading, compilation
+    and kernel autotuning happen at startup rather than on the first request.
+    """
+    model, tokenizer, checkpoint = get_model()
+    predict_fake_news("warmup text", model, tokenizer, checkpoint)
+
+
+async def run_inference(func, *args, **kwargs):
+    """Run a blocking model call (e.g. predict_fake_news) on the inference pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_inference_executor, partial(func, *args, **kwargs))
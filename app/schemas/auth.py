@@ -84,3 +84,4 @@ class TokenData(BaseModel):
     """Schema for decoded token data"""
     user_id: Optional[str] = None
     email: Optional[str] = None
+    exp: Optional[int] = None
@@ -1,11 +1,13 @@
 import os
 import re
-import time
-from google import genai
-from dotenv import load_dotenv
-from typing import Optional, Dict, List
+import json
+import asyncio
+from app.utils.env import load_env
+from typing import Optional, Dict, List, Union
+from app.utils.claim_features import ClaimFeatures, to_features
+from app.utils.llm_cache import LLMCache, FileBackend, SemanticCache
 
-load_dotenv()
+load_env()
 
 # Models to try in order (current stable models per docs.ai.google.dev/gemini-api/docs/models)
 _CANDIDATE_MODELS = [
@@ -16,6 +18,82 @@ _CANDIDATE_MODELS = [
 
 _MAX_RETRIES = 3
 _RETRY_DELAY = 30  # seconds to wait on quota error
+_BATCH_CONCURRENCY = 20  # max concurrent Gemini calls in predict_batch
+
+# Identical prompts get identical answers (default temperature), so responses
+# are cached on disk and survive restarts
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join(_PROJECT_ROOT, 'data', 'llm_cache.json'))
+LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', '86400'))
+# Reuse verdicts for paraphrased claims (needs hnswlib + sentence-transformers)
+ENABLE_SEMANTIC_CACHE = os.getenv('ENABLE_SEMANTIC_CACHE', 'false').lower() == 'true'
+_SEMANTIC_CONFIDENCE_DAMPING = 0.95
+
+# Gemini is asked for JSON matching this schema, so the verdict parses without
+# scraping free text. Field order is fixed: the verdict streams before reasoning
+_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "classification": {"type": "STRING", "enum": ["REAL", "FAKE", "UNVERIFIED"]},
+        "confidence": {"type": "INTEGER", "minimum": 0, "maximum": 100},
+        "reasoning": {"type": "STRING"},
+    },
+    "required": ["classification", "confidence", "reasoning"],
+    "property_ordering": ["classification", "confidence", "reasoning"],
+}
+# 2.5 models count thinking tokens against this budget; thinking is switched
+# off for them (see _THINKING_MODELS) so the whole budget goes to the JSON
+_MAX_OUTPUT_TOKENS = 1024
+# Models that accept a thinking_config; older models reject the field
+_THINKING_MODELS = ("gemini-2.5-",)
+
+# Fields of a (possibly truncated) JSON verdict
+_JSON_CLASSIFICATION_RE = re.compile(r'"classification"\s*:\s*"(\w+)"', re.IGNORECASE)
+_JSON_CONFIDENCE_RE = re.compile(r'"confidence"\s*:\s*(\d+(?:\.\d+)?)\s*[,}]', re.IGNORECASE)
+_JSON_REASONING_RE = re.compile(r'"reasoning"\s*:\s*"((?:[^"\\]|\\.)*)', re.IGNORECASE)
+
+# Fixed fact-checking rules, sent as the system instruction so each request
+# carries only the claim (and evidence) and the prefix is identical across calls
+_INSTRUCTION_WITH_EVIDENCE = """You are an expert fact-checker. Each message gives a CLAIM TO VERIFY followed by real news articles retrieved from the web. Assess whether the claim is TRUE, FALSE, or UNVERIFIED.
+
+CLASSIFICATION RULES — read carefully before deciding:
+
+• REAL — Use this when:
+  - The retrieved articles SPECIFICALLY confirm the core factual event described in the claim (who, what, where) actually happened.
+  - The claim's key facts are directly supported by the articles — not just topically related.
+  - Sensationalist phrasing of a CONFIRMED real event is NOT fake news.
+  - Do NOT choose REAL merely because the articles cover a related topic without confirming the specific claim.
+
+• FAKE — Use this when:
+  - The retrieved articles DIRECTLY CONTRADICT the specific factual assertion (e.g. the event did not happen, the wrong person is named, the statistic is fabricated).
+  - The claim describes a HIGH-PROFILE EXTRAORDINARY EVENT (e.g. assassination of a sitting world leader, nuclear exchange, military attack on a capital city, declaration of world war) that would generate massive global breaking news coverage, yet NONE of the retrieved articles mention it occurring.
+  - There is clear evidence of fabrication or misinformation.
+  - Do NOT choose FAKE simply because the claim uses strong language or covers a sensitive topic — only when the specific facts are contradicted or clearly absent from worldwide coverage.
+
+• UNVERIFIED — Use this when:
+  - The retrieved articles cover a related topic but do NOT specifically confirm or deny the claim.
+  - The claim is about an ordinary or minor event in 2025–2026 that may not be fully reported yet.
+  - You cannot determine truth or falsehood from the available evidence.
+  - When in doubt between FAKE and UNVERIFIED for ORDINARY claims, choose UNVERIFIED.
+  - EXCEPTION: For extraordinary high-profile claims (world leader death, nuclear attack, etc.), if no article confirms it, choose FAKE — not UNVERIFIED.
+
+IMPORTANT: Finding articles about a RELATED TOPIC (e.g. Iran missile attacks) does NOT confirm a SPECIFIC claim (e.g. US President was killed). Check whether the articles confirm the exact claim, not just the general subject area.
+
+Respond with JSON: "classification" (REAL, FAKE or UNVERIFIED), "confidence" (0-100) and "reasoning" (a brief explanation referencing the articles)."""
+
+_INSTRUCTION_NO_EVIDENCE = """You are an expert fact-checker. Each message gives a CLAIM TO VERIFY; no live news articles were retrieved for it.
+
+INSTRUCTIONS:
+- For ordinary events in 2024–2026, default to UNVERIFIED — they may simply be outside your training data.
+- EXCEPTION: For extraordinary high-profile claims (e.g. assassination of a sitting world leader, nuclear war, major capital city attacked, declaration of world war between superpowers), the ABSENCE of news coverage is itself strong evidence the event did not happen. Such events would generate instant worldwide breaking news. If you have no knowledge of the event occurring AND no articles confirm it, classify as FAKE.
+- Choose FAKE for claims with clearly impossible statistics, demonstrably established hoaxes, direct logical impossibilities, classic misinformation patterns, or extraordinary world-headline events for which no confirmation exists anywhere.
+- Choose REAL only if you have strong, specific knowledge confirming this exact claim.
+- When uncertain about ordinary claims: UNVERIFIED is safer than FAKE.
+
+Respond with JSON: "classification" (REAL, FAKE or UNVERIFIED), "confidence" (0-100) and "reasoning" (a brief explanation)."""
+
+# Keyed by "evidence included?"
+_INSTRUCTIONS = {True: _INSTRUCTION_WITH_EVIDENCE, False: _INSTRUCTION_NO_EVIDENCE}
 
 class AIFactChecker:
     def __init__(self):
@@ -23,11 +101,40 @@ class AIFactChecker:
         self.enabled = os.getenv('ENABLE_AI_CHECK', 'true').lower() == 'true'
         self._client = None
         self._model_id = None
-
-        if api_key and api_key != 'your_api_key_here' and len(api_key) > 10:
+        self._gen_configs = {}
+        self.cache = LLMCache(backend=FileBackend(LLM_CACHE_PATH), ttl_seconds=LLM_CACHE_TTL_SECONDS)
+        self.semantic_cache = None
+        if ENABLE_SEMANTIC_CACHE:
             try:
+                self.semantic_cache = SemanticCache(ttl_seconds=LLM_CACHE_TTL_SECONDS)
+            except ImportError as e:
+                print(f"⚠ Semantic cache disabled: {e}")
+
+        if not self.enabled:
+            # Skip importing the Gemini SDK (and its gRPC/auth stack) entirely
+            print("⚠ AI check disabled (ENABLE_AI_CHECK=false), using BERT model only")
+        elif api_key and api_key != 'your_api_key_here' and len(api_key) > 10:
+            try:
+                from google import genai
+                from google.genai import types
+
                 # New google-genai SDK uses a Client object
                 self._client = genai.Client(api_key=api_key)
+                # One config per (model, instruction variant)
+                self._gen_configs = {
+                    (model_id, with_evidence): types.GenerateContentConfig(
+                        system_instruction=instruction,
+                        response_mime_type="application/json",
+                        response_schema=_RESPONSE_SCHEMA,
+                        max_output_tokens=_MAX_OUTPUT_TOKENS,
+                        thinking_config=(
+                            types.ThinkingConfig(thinking_budget=0)
+                            if model_id.startswith(_THINKING_MODELS) else None
+                        ),
+                    )
+                    for model_id in _CANDIDATE_MODELS
+                    for with_evidence, instruction in _INSTRUCTIONS.items()
+                }
                 # Pick the first model that doesn't raise on a list call
                 self._model_id = _CANDIDATE_MODELS[0]  # will be confirmed on first call
                 self.enabled = True
@@ -44,52 +151,56 @@ class AIFactChecker:
             print("⚠ AI API key not configured, using BERT model only")
 
     # ── robust response parser ─────────────────────────────────────────────────
+    @staticmethod
+    def _parse_json_fields(text_response: str) -> Optional[tuple]:
+        """
+        (label, confidence %, reasoning) from the JSON response. Falls back to
+        field regexes for a stream cut off before the closing brace.
+        """
+        try:
+            data = json.loads(text_response)
+            return (
+                str(data["classification"]).upper(),
+                float(data["confidence"]) if data.get("confidence") is not None else None,
+                str(data.get("reasoning") or ""),
+            )
+        except (ValueError, KeyError, TypeError, AttributeError):
+            pass
+        label = _JSON_CLASSIFICATION_RE.search(text_response)
+        if not label:
+            return None
+        confidence = _JSON_CONFIDENCE_RE.search(text_response)
+        reasoning = _JSON_REASONING_RE.search(text_response)
+        return (
+            label.group(1).upper(),
+            float(confidence.group(1)) if confidence else None,
+            reasoning.group(1) if reasoning else "",
+        )
+
     def _parse_response(self, text_response: str) -> Optional[Dict]:
         """
-        Parse Gemini's structured response.
-        Uses strict regex to avoid false-fake from lines like 'REAL (not FAKE)'.
+        Parse Gemini's JSON verdict. None when the reply carries no verdict
+        (empty, blocked, cut off early, or not JSON despite the schema).
         """
         print(f"[Gemini raw response]:\n{text_response}\n---")
 
-        # Strict match: look for CLASSIFICATION line
-        # Valid values: REAL, FAKE, UNVERIFIED
-        classification = "fake"  # default — for claims that can't be confirmed, lean fake
-        unverified = False
-        for line in text_response.split('\n'):
-            if 'CLASSIFICATION' in line.upper():
-                after_colon = line.split(':', 1)[-1].strip().upper()
-                if re.search(r'\bFAKE\b', after_colon) and not re.search(r'\bNOT\s+FAKE\b', after_colon):
-                    classification = "fake"
-                elif re.search(r'\b(UNVERIFIED|UNCERTAIN|UNCLEAR|MISLEADING)\b', after_colon):
-                    # UNVERIFIED = we cannot confirm the claim → treat as fake (safer default)
-                    classification = "fake"
-                    unverified = True
-                elif re.search(r'\bREAL\b', after_colon):
-                    classification = "real"
-                break
+        fields = self._parse_json_fields(text_response)
+        if fields is None or fields[0] not in ("REAL", "FAKE", "UNVERIFIED"):
+            return None
+        label, confidence_pct, reasoning = fields
+
+        # UNVERIFIED = we cannot confirm the claim → treat as fake (safer default)
+        unverified = label == "UNVERIFIED"
+        classification = "real" if label == "REAL" else "fake"
 
         # UNVERIFIED gets a lower base confidence (0.60) instead of 0.75
         confidence = 0.60 if unverified else 0.75
-        for line in text_response.split('\n'):
-            if 'CONFIDENCE' in line.upper():
-                match = re.search(r'(\d+(?:\.\d+)?)', line)
-                if match:
-                    confidence = float(match.group(1)) / 100.0
-                    if unverified:
-                        confidence = min(confidence, 0.68)  # cap UNVERIFIED so it stays low-confidence
-                    confidence = min(max(confidence, 0.50), 0.99)
-                break
-
-        # Extract the REASONING line for user-facing display
-        reasoning = ""
-        capture = False
-        for line in text_response.split('\n'):
-            if 'REASONING' in line.upper():
-                reasoning = line.split(':', 1)[-1].strip() if ':' in line else ""
-                capture = True
-                continue
-            if capture and line.strip():
-                reasoning += " " + line.strip()
+        if confidence_pct is not None:
+            confidence = confidence_pct / 100.0
+            if unverified:
+                confidence = min(confidence, 0.68)  # cap UNVERIFIED so it stays low-confidence
+            confidence = min(max(confidence, 0.50), 0.99)
+
         reasoning = reasoning.strip() or "No detailed reasoning provided."
 
         return {
@@ -105,152 +216,192 @@ class AIFactChecker:
             "ai_enabled": True,
         }
 
+    # ── prompt construction ───────────────────────────────────────────────────
+    def _build_prompt(self, text: str, news_articles: Optional[List[Dict]]) -> tuple:
+        """
+        Build the per-claim message. Returns (prompt, number of articles used as
+        evidence, whether evidence is included) — the last picks the system instruction.
+        """
+        # ── Build evidence block ──────────────────────────────────────────
+        evidence_block = ""
+        usable_articles = [a for a in (news_articles or []) if a.get("title")]
+        if usable_articles:  # noqa: SIM102
+            lines = []
+            for i, art in enumerate(usable_articles[:5], 1):
+                title    = art.get("title", "").strip()
+                source   = art.get("source", "Unknown")
+                url      = art.get("url", "")
+                pub_date = (art.get("published_at") or "").strip()
+                desc     = (art.get("description") or art.get("snippet") or "").strip()[:300]
+                snippet  = (art.get("fetched_snippet") or "").strip()[:500]
+
+                entry  = f"[Article {i}] {source}\n"
+                if pub_date:
+                    entry += f"  Published: {pub_date}\n"
+                entry += f"  Headline : {title}\n"
+                if desc:
+                    entry += f"  Summary  : {desc}\n"
+                if snippet:
+                    entry += f"  Body text: {snippet}\n"
+                if url:
+                    entry += f"  URL      : {url}\n"
+                lines.append(entry)
+
+            evidence_block = (
+                "\n=== LIVE NEWS ARTICLES RETRIEVED FROM THE WEB ===\n"
+                + "\n".join(lines)
+                + "=== END OF RETRIEVED ARTICLES ===\n"
+            )
+
+        # ── Prompt: the static rules travel as the system instruction ─────
+        if evidence_block:
+            prompt = f'CLAIM TO VERIFY: "{text}"\n\nREAL NEWS ARTICLES RETRIEVED FROM THE WEB:\n{evidence_block}'
+        else:
+            prompt = f'CLAIM TO VERIFY: "{text}"'
+
+        return prompt, len(usable_articles), bool(evidence_block)
+
+    @staticmethod
+    def _quota_retry_delay(err_str: str) -> Optional[int]:
+        """Suggested wait in seconds if the error is a quota error, else None."""
+        is_quota = (
+            "quota" in err_str.lower()
+            or "429" in err_str
+            or "resource_exhausted" in err_str.lower()
+        )
+        if not is_quota:
+            return None
+        # Parse suggested retry delay from error body
+        delay_match = re.search(r'retry in (\d+(?:\.\d+)?)s', err_str.lower())
+        return int(float(delay_match.group(1))) + 2 if delay_match else _RETRY_DELAY
+
+    # ── streaming ─────────────────────────────────────────────────────────────
+    @staticmethod
+    def _verdict_complete(buf: str) -> bool:
+        return _JSON_CLASSIFICATION_RE.search(buf) is not None and _JSON_CONFIDENCE_RE.search(buf) is not None
+
+    async def _agenerate_text(self, model_id: str, prompt: str, with_evidence: bool, include_reasoning: bool) -> tuple:
+        """
+        Stream a response. Without reasoning, stop as soon as the verdict is
+        parsed. Returns (text, truncated). A reply that ran into
+        max_output_tokens raises, so the caller moves on to the next model.
+        """
+        buf = ""
+        finish_reason = None
+        stream = await self._client.aio.models.generate_content_stream(
+            model=model_id, contents=prompt, config=self._gen_configs[(model_id, with_evidence)]
+        )
+        try:
+            async for chunk in stream:
+                buf += chunk.text or ""
+                if not include_reasoning and self._verdict_complete(buf):
+                    return buf, True
+                if chunk.candidates and chunk.candidates[0].finish_reason is not None:
+                    finish_reason = chunk.candidates[0].finish_reason
+            if getattr(finish_reason, "name", finish_reason) == "MAX_TOKENS":
+                raise ValueError("response hit max_output_tokens")
+            return buf, False
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()  # stop the rest of the stream
+
+    # ── semantic cache ────────────────────────────────────────────────────────
+    def _semantic_lookup(self, features: ClaimFeatures, with_evidence: bool) -> tuple:
+        """
+        Returns (cached result or None, (embedding, proper nouns) or None).
+        Claims without proper nouns skip the semantic cache entirely: the
+        entity check is what keeps "X was arrested" from matching "Y was
+        arrested", and with no entities it would pass for anything.
+        """
+        entities = features.proper_nouns
+        if not entities:
+            return None, None
+        if features.embedding is None:
+            features.embedding = self.semantic_cache.embed(features.raw)
+        embedding = features.embedding
+        cached = self.semantic_cache.get(embedding, entities, variant=with_evidence)
+        if cached is not None:
+            # A paraphrase is weaker evidence than the exact claim; keep the
+            # same 0.50 floor as _parse_response so the verdict never flips
+            confidence = max(0.5, round(cached["confidence"] * _SEMANTIC_CONFIDENCE_DAMPING, 4))
+            cached["confidence"] = confidence
+            cached["probabilities"] = {
+                "fake": confidence if cached["is_fake"] else round(1 - confidence, 4),
+                "real": round(1 - confidence, 4) if cached["is_fake"] else confidence,
+            }
+            cached["semantic_cache_hit"] = True
+        return cached, (embedding, entities)
+
     # ── context-aware primary prediction ──────────────────────────────────────
-    def predict_with_context(
+    async def apredict_with_context(
         self,
-        text: str,
+        claim: Union[str, ClaimFeatures],
         news_articles: Optional[List[Dict]] = None,
+        include_reasoning: bool = True,
     ) -> Optional[Dict]:
         """
         PRIMARY predictor. Gemini receives:
           - The user's claim / headline
           - Real news articles (title + description + fetched body snippet + URL)
         Uses evidence to decide REAL vs FAKE.
+        With include_reasoning=False the response stream is cut off once
+        CLASSIFICATION and CONFIDENCE are in, so `reasoning` is a placeholder.
+        Uses the SDK's native async client (client.aio), so concurrent calls
+        need no worker threads and quota back-off sleeps do not hold one.
         """
         if not self.enabled or not self._client:
             return None
 
         try:
-            # ── Build evidence block ──────────────────────────────────────────
-            evidence_block = ""
-            usable_articles = [a for a in (news_articles or []) if a.get("title")]
-            if usable_articles:  # noqa: SIM102
-                lines = []
-                for i, art in enumerate(usable_articles[:5], 1):
-                    title    = art.get("title", "").strip()
-                    source   = art.get("source", "Unknown")
-                    url      = art.get("url", "")
-                    pub_date = (art.get("published_at") or "").strip()
-                    desc     = (art.get("description") or art.get("snippet") or "").strip()[:300]
-                    snippet  = (art.get("fetched_snippet") or "").strip()[:500]
-
-                    entry  = f"[Article {i}] {source}\n"
-                    if pub_date:
-                        entry += f"  Published: {pub_date}\n"
-                    entry += f"  Headline : {title}\n"
-                    if desc:
-                        entry += f"  Summary  : {desc}\n"
-                    if snippet:
-                        entry += f"  Body text: {snippet}\n"
-                    if url:
-                        entry += f"  URL      : {url}\n"
-                    lines.append(entry)
-
-                evidence_block = (
-                    "\n=== LIVE NEWS ARTICLES RETRIEVED FROM THE WEB ===\n"
-                    + "\n".join(lines)
-                    + "=== END OF RETRIEVED ARTICLES ===\n"
-                )
-
-            # ── Prompt ────────────────────────────────────────────────────────
-            if evidence_block:
-                prompt = f"""You are an expert fact-checker. Assess whether the following claim is TRUE, FALSE, or UNVERIFIED.
-
-CLAIM TO VERIFY: "{text}"
-
-REAL NEWS ARTICLES RETRIEVED FROM THE WEB:
-{evidence_block}
-
-CLASSIFICATION RULES — read carefully before deciding:
-
-• REAL — Use this when:
-  - The retrieved articles SPECIFICALLY confirm the core factual event described in the claim (who, what, where) actually happened.
-  - The claim's key facts are directly supported by the articles — not just topically related.
-  - Sensationalist phrasing of a CONFIRMED real event is NOT fake news.
-  - Do NOT choose REAL merely because the articles cover a related topic without confirming the specific claim.
-
-• FAKE — Use this when:
-  - The retrieved articles DIRECTLY CONTRADICT the specific factual assertion (e.g. the event did not happen, the wrong person is named, the statistic is fabricated).
-  - The claim describes a HIGH-PROFILE EXTRAORDINARY EVENT (e.g. assassination of a sitting world leader, nuclear exchange, military attack on a capital city, declaration of world war) that would generate massive global breaking news coverage, yet NONE of the retrieved articles mention it occurring.
-  - There is clear evidence of fabrication or misinformation.
-  - Do NOT choose FAKE simply because the claim uses strong language or covers a sensitive topic — only when the specific facts are contradicted or clearly absent from worldwide coverage.
-
-• UNVERIFIED — Use this when:
-  - The retrieved articles cover a related topic but do NOT specifically confirm or deny the claim.
-  - The claim is about an ordinary or minor event in 2025–2026 that may not be fully reported yet.
-  - You cannot determine truth or falsehood from the available evidence.
-  - When in doubt between FAKE and UNVERIFIED for ORDINARY claims, choose UNVERIFIED.
-  - EXCEPTION: For extraordinary high-profile claims (world leader death, nuclear attack, etc.), if no article confirms it, choose FAKE — not UNVERIFIED.
-
-IMPORTANT: Finding articles about a RELATED TOPIC (e.g. Iran missile attacks) does NOT confirm a SPECIFIC claim (e.g. US President was killed). Check whether the articles confirm the exact claim, not just the general subject area.
-
-YOU MUST RESPOND IN EXACTLY THIS FORMAT — no preamble, no extra lines:
-CLASSIFICATION: REAL
-CONFIDENCE: 85%
-REASONING: Brief explanation referencing the articles.
-
-Valid classifications: REAL, FAKE, UNVERIFIED"""
-            else:
-                prompt = f"""You are an expert fact-checker.
+            features = to_features(claim)
+            prompt, context_articles, with_evidence = self._build_prompt(features.raw, news_articles)
+            cache_key = self.cache.make_key(_CANDIDATE_MODELS, _INSTRUCTIONS[with_evidence] + prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            semantic = None
+            if self.semantic_cache is not None:
+                # Embedding is CPU-bound; keep it off the event loop
+                cached, semantic = await asyncio.to_thread(self._semantic_lookup, features, with_evidence)
+                if cached is not None:
+                    return cached
 
-CLAIM TO VERIFY: "{text}"
-
-No live news articles were retrieved for this claim.
-
-INSTRUCTIONS:
-- For ordinary events in 2024–2026, default to UNVERIFIED — they may simply be outside your training data.
-- EXCEPTION: For extraordinary high-profile claims (e.g. assassination of a sitting world leader, nuclear war, major capital city attacked, declaration of world war between superpowers), the ABSENCE of news coverage is itself strong evidence the event did not happen. Such events would generate instant worldwide breaking news. If you have no knowledge of the event occurring AND no articles confirm it, classify as FAKE.
-- Choose FAKE for claims with clearly impossible statistics, demonstrably established hoaxes, direct logical impossibilities, classic misinformation patterns, or extraordinary world-headline events for which no confirmation exists anywhere.
-- Choose REAL only if you have strong, specific knowledge confirming this exact claim.
-- When uncertain about ordinary claims: UNVERIFIED is safer than FAKE.
-
-YOU MUST RESPOND IN EXACTLY THIS FORMAT — no preamble:
-CLASSIFICATION: UNVERIFIED
-CONFIDENCE: 60%
-REASONING: Brief explanation here.
-
-Valid classifications: REAL, FAKE, UNVERIFIED"""
-
-            # ── Call Gemini — try each model, fall to next on quota error ────
             last_error = None
+            wait = _RETRY_DELAY
             for attempt in range(_MAX_RETRIES):
                 all_quota = True
                 for model_id in _CANDIDATE_MODELS:
                     try:
-                        response = self._client.models.generate_content(
-                            model=model_id,
-                            contents=prompt,
+                        text_response, truncated = await self._agenerate_text(
+                            model_id, prompt, with_evidence, include_reasoning
                         )
                         self._model_id = model_id
-                        result = self._parse_response(response.text)
-                        if result:
-                            result["context_articles_used"] = len(usable_articles)
+                        result = self._parse_response(text_response)
+                        if result is None:
+                            # Handled like any other model error: try the next model
+                            raise ValueError("response contained no verdict")
+                        result["context_articles_used"] = context_articles
+                        # Only complete answers are reusable by callers that need reasoning
+                        if not truncated:
+                            self.cache.set(cache_key, result)
+                            if semantic is not None:
+                                self.semantic_cache.set(*semantic, result, variant=with_evidence)
                         return result
                     except Exception as model_err:
-                        err_str = str(model_err)
                         last_error = model_err
-                        is_quota = (
-                            "quota" in err_str.lower()
-                            or "429" in err_str
-                            or "resource_exhausted" in err_str.lower()
-                        )
-                        if is_quota:
-                            # Parse suggested retry delay from error body
-                            delay_match = re.search(r'retry in (\d+(?:\.\d+)?)s', err_str.lower())
-                            suggested = int(float(delay_match.group(1))) + 2 if delay_match else _RETRY_DELAY
+                        suggested = self._quota_retry_delay(str(model_err))
+                        if suggested is not None:
+                            wait = suggested
                             print(f"⚠ Quota on {model_id} (attempt {attempt+1}), trying next model…")
-                            # DO NOT sleep here — try next model first
-                            continue  # ← try next model immediately
-                        else:
-                            all_quota = False
-                            print(f"⚠ Model {model_id} error: {err_str[:120]}")
-                            continue  # try next model
-
-                # All models failed this attempt
+                            continue
+                        all_quota = False
+                        print(f"⚠ Model {model_id} error: {str(model_err)[:120]}")
+                        continue
+
                 if all_quota and attempt < _MAX_RETRIES - 1:
-                    wait = suggested if 'suggested' in dir() else _RETRY_DELAY
                     print(f"⚠ All models quota-exhausted. Waiting {wait}s before retry {attempt+2}/{_MAX_RETRIES}…")
-                    time.sleep(wait)
+                    await asyncio.sleep(wait)
 
             print(f"Gemini: all {len(_CANDIDATE_MODELS)} models failed after {_MAX_RETRIES} attempts. Last error: {str(last_error)[:200]}")
             return None
@@ -259,14 +410,63 @@ Valid classifications: REAL, FAKE, UNVERIFIED"""
             print(f"Gemini unexpected error: {e}")
             return None
 
+    async def predict_batch(
+        self,
+        texts: List[Union[str, ClaimFeatures]],
+        concurrency: int = _BATCH_CONCURRENCY,
+        include_reasoning: bool = False,
+    ) -> List[Optional[Dict]]:
+        """
+        Fact-check several claims concurrently (no news context), at most
+        `concurrency` Gemini calls in flight at once to respect rate limits.
+        Verdicts only by default (see apredict_with_context); results are
+        returned in input order.
+        """
+        sem = asyncio.Semaphore(concurrency)
+
+        async def run(text: Union[str, ClaimFeatures]) -> Optional[Dict]:
+            async with sem:
+                return await self.apredict_with_context(text, include_reasoning=include_reasoning)
+
+        return await asyncio.gather(*(run(text) for text in texts))
+
+    def clear_caches(self):
+        """Drop cached Gemini responses (exact-match and semantic)."""
+        self.cache.clear()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
     # ── backwards-compat wrappers ──────────────────────────────────────────────
-    def predict(self, text: str) -> Optional[Dict]:
-        return self.predict_with_context(text, news_articles=None)
+    @staticmethod
+    def _run_sync(coro):
+        """Run a coroutine to completion for callers without an event loop."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        coro.close()
+        raise RuntimeError(
+            "AIFactChecker sync methods cannot be used inside a running event loop; "
+            "await apredict_with_context() instead"
+        )
+
+    def predict_with_context(
+        self,
+        claim: Union[str, ClaimFeatures],
+        news_articles: Optional[List[Dict]] = None,
+        include_reasoning: bool = True,
+    ) -> Optional[Dict]:
+        """Blocking wrapper around apredict_with_context (scripts, notebooks)."""
+        return self._run_sync(self.apredict_with_context(claim, news_articles, include_reasoning))
+
+    def predict(self, claim: Union[str, ClaimFeatures]) -> Optional[Dict]:
+        return self.predict_with_context(claim, news_articles=None)
 
-    def check_claim(self, text: str) -> Optional[Dict]:
-        return self.predict(text)
+    def check_claim(self, claim: Union[str, ClaimFeatures]) -> Optional[Dict]:
+        return self.predict(claim)
 
     def reconcile_predictions(self, bert_prediction: Dict, ai_result: Optional[Dict]) -> Dict:
+        """Final prediction: Gemini's verdict when available, else a copy of BERT's."""
         if ai_result and self.enabled:
             return {
                 "text": bert_prediction.get("text", ""),
@@ -276,7 +476,9 @@ Valid classifications: REAL, FAKE, UNVERIFIED"""
                 "is_fake": ai_result["is_fake"],
                 "classification_type": "binary",
             }
-        return {**bert_prediction, "is_fake": bert_prediction["prediction"] == "fake"}
+        result = bert_prediction.copy()
+        result["is_fake"] = result["prediction"] == "fake"
+        return result
 
 
 # Global instance
@@ -0,0 +1,92 @@
+import re
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Set, Union
+
+# Common stop words filtered out of search keywords
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+                         'of', 'with', 'is', 'are', 'was', 'were', 'been', 'be', 'have', 'has',
+                         'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may',
+                         'might', 'can', 'said', 'says', 'that', 'this', 'they', 'their', 'them',
+                         'there', 'these', 'those', 'what', 'which', 'when', 'where', 'who', 'whom',
+                         'how', 'why', 'just', 'only', 'even', 'also', 'very', 'most', 'some',
+                         'many', 'much', 'more', 'other', 'than', 'then', 'now', 'here', 'such',
+                         'like', 'into', 'over', 'after', 'before', 'between', 'under', 'again',
+                         'about', 'being', 'once', 'during', 'each', 'because', 'through', 'while',
+                         'news', 'breaking', 'report', 'says', 'according', 'announced', 'claims',
+                         'article', 'story', 'sources', 'officials', 'people', 'percent', 'years'})
+_WORD_RE = re.compile(r'\b[A-Za-z]{3,}\b')
+
+
+def _select_keywords(tokens) -> List[str]:
+    """Pick search keywords: proper nouns first, then other non-stop words."""
+    # Prioritize capitalized words (likely proper nouns - names, places, organizations)
+    proper_nouns = [w for w in tokens if w[0].isupper() and w.lower() not in _STOP_WORDS]
+
+    # Get other important words
+    other_words = [w.lower() for w in tokens if w.lower() not in _STOP_WORDS and not w[0].isupper()]
+
+    # Combine: proper nouns first, then other words
+    keywords = proper_nouns[:4] + other_words[:3]
+
+    # Remove duplicates while preserving order
+    seen = set()
+    unique_keywords = []
+    for k in keywords:
+        k_lower = k.lower()
+        if k_lower not in seen:
+            seen.add(k_lower)
+            unique_keywords.append(k)
+
+    return unique_keywords[:6]
+
+
+@lru_cache(maxsize=256)
+def _tokenize(normalized: str) -> tuple:
+    """(tokens, keywords, long words) for whitespace-normalised text; cached for repeat claims."""
+    tokens = tuple(_WORD_RE.findall(normalized))
+    return (
+        tokens,
+        tuple(_select_keywords(tokens)),
+        frozenset(word.lower() for word in normalized.split(' ') if len(word) > 4),
+    )
+
+
+@dataclass
+class ClaimFeatures:
+    """
+    Everything the pipeline derives from a claim's text, computed once at the
+    route and shared by news validation and the Gemini fact-check.
+    """
+    raw: str
+    normalized: str                       # whitespace collapsed
+    tokens: List[str]                     # words of 3+ letters, original case
+    keywords: List[str]                   # search keywords, proper nouns first
+    long_words: Set[str]                  # lowercased words longer than 4 chars
+    embedding: Optional[Any] = field(default=None, repr=False)  # set by the semantic cache
+
+    @classmethod
+    def from_text(cls, text: str) -> "ClaimFeatures":
+        normalized = ' '.join(text.split())
+        tokens, keywords, long_words = _tokenize(normalized)
+        return cls(
+            raw=text,
+            normalized=normalized,
+            tokens=list(tokens),
+            keywords=list(keywords),
+            long_words=set(long_words),
+        )
+
+    @property
+    def proper_nouns(self) -> List[str]:
+        return [k for k in self.keywords if k[0].isupper()]
+
+
+def to_features(claim: Union[str, ClaimFeatures]) -> ClaimFeatures:
+    """Accept either raw text or precomputed features."""
+    return claim if isinstance(claim, ClaimFeatures) else ClaimFeatures.from_text(claim)
+
+
+def clear_feature_cache() -> None:
+    """Drop memoised tokenizations (tests, or after changing the stop words)."""
+    _tokenize.cache_clear()
@@ -0,0 +1,9 @@
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=None)
+def load_env() -> bool:
+    """Load .env into os.environ once per process; later calls are free."""
+    return load_dotenv()
@@ -1,7 +1,7 @@
 import os
 import base64
 import requests
-from dotenv import load_dotenv
+from app.utils.env import load_env
 from typing import Optional, Dict
 
 try:
@@ -14,7 +14,7 @@ except Exception:
     except Exception:
         Mistral = None
 
-load_dotenv()
+load_env()
 
 class ImageOCR:
     """
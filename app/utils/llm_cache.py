@@ -0,0 +1,282 @@
+import os
+import copy
+import json
+import time
+import atexit
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from collections import deque
+from typing import Optional, Dict, Protocol, Iterable, Tuple
+
+
+class CacheBackend(Protocol):
+    """Storage used by LLMCache. Entries are JSON-serialisable dicts."""
+
+    def get(self, key: str) -> Optional[Dict]: ...
+
+    def set(self, key: str, entry: Dict) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryBackend:
+    """In-process backend; evicts the oldest entry once max_entries is reached."""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._data.get(key)
+
+    def set(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._on_change()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._on_change()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._on_change()
+
+    def _on_change(self) -> None:
+        """Hook for persistent subclasses; called with the lock held."""
+
+
+class FileBackend(MemoryBackend):
+    """
+    MemoryBackend persisted to a JSON file so cached responses survive
+    restarts. Changes are coalesced and written by a background timer
+    `flush_delay` seconds after the first one, so a set() never does file I/O
+    on the caller's thread. Each write goes to its own temp file and is
+    renamed into place, which keeps the file intact when several workers
+    share the same path (the last snapshot wins).
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, flush_delay: float = 1.0):
+        super().__init__(max_entries=max_entries)
+        self.path = path
+        self.flush_delay = flush_delay
+        self._flush_timer: Optional[threading.Timer] = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._data.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠ Could not load LLM cache from {path}: {e}")
+        # Write out whatever the last timer has not yet persisted
+        atexit.register(self.flush)
+
+    def _on_change(self) -> None:
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self) -> None:
+        """Write the current entries to disk now."""
+        with self._lock:
+            if self._flush_timer is None:
+                return
+            self._flush_timer.cancel()
+            self._flush_timer = None
+            # Stored entries are never mutated, so a shallow copy is a consistent snapshot
+            snapshot = dict(self._data)
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            print(f"⚠ Could not persist LLM cache to {self.path}: {e}")
+
+
+class LLMCache:
+    """
+    Exact-match cache for LLM responses, keyed on a SHA-256 of the model and
+    prompt. Only safe for deterministic calls (same prompt -> same answer).
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl_seconds: int = 86400):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model, prompt: str) -> str:
+        payload = json.dumps({"model": model, "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry["expires_at"] < time.time():
+            self.backend.delete(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Callers may mutate the result; never hand out the stored object
+        return copy.deepcopy(entry["value"])
+
+    def set(self, key: str, value: Dict) -> None:
+        self.backend.set(key, {
+            "value": copy.deepcopy(value),
+            "expires_at": time.time() + self.ttl_seconds,
+        })
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SemanticCache:
+    """
+    Near-duplicate cache: embeds the claim text and returns the response of the
+    closest previously seen claim when the cosine distance is below `threshold`.
+
+    Paraphrases share most words, but so do claims about different people
+    ("X was arrested" / "Y was arrested"), so a hit additionally requires the
+    proper nouns of one claim to be a subset of the other's; callers should
+    not use the cache for claims without any. Entries are also tagged with a
+    `variant` (e.g. whether the prompt carried news evidence) that must match,
+    and expire after `ttl_seconds` like the exact-match cache.
+    Requires the optional hnswlib and sentence-transformers packages.
+    """
+
+    # Nearest neighbours inspected per lookup, so an expired entry or one of
+    # another variant does not hide a usable match just behind it
+    _CANDIDATES = 4
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        dim: int = 384,
+        max_entries: int = 10_000,
+        threshold: float = 0.15,
+        ttl_seconds: int = 86400,
+    ):
+        # Imported here so the exact-match cache never pays for these
+        try:
+            import hnswlib
+            from sentence_transformers import SentenceTransformer
+        except Exception as e:
+            raise ImportError("SemanticCache requires hnswlib and sentence-transformers") from e
+        self._encoder_cls = SentenceTransformer
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._encoder = None
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(max_elements=max_entries, ef_construction=200, M=16, allow_replace_deleted=True)
+        self._index.set_ef(50)
+        # label -> (variant, entities, expires_at, value)
+        self._entries: Dict[int, Tuple[object, frozenset, float, Dict]] = {}
+        self._order: deque = deque()
+        self._next_label = 0
+        self._lock = threading.Lock()
+
+    def embed(self, text: str):
+        # Load the encoder on first use so importing the app stays cheap
+        if self._encoder is None:
+            with self._lock:
+                if self._encoder is None:
+                    self._encoder = self._encoder_cls(self.model_name)
+        return self._encoder.encode([text], normalize_embeddings=True)
+
+    def _evict_oldest(self) -> None:
+        """Free the oldest slot for reuse; called with the lock held."""
+        oldest = self._order.popleft()
+        self._index.mark_deleted(oldest)
+        del self._entries[oldest]
+
+    def _evict_expired(self, now: float) -> None:
+        # Every entry gets the same TTL, so insertion order is expiry order
+        while self._order and self._entries[self._order[0]][2] <= now:
+            self._evict_oldest()
+
+    def get(self, embedding, entities: Iterable[str], variant=None) -> Optional[Dict]:
+        entities = frozenset(e.lower() for e in entities)
+        match = None
+        with self._lock:
+            self._evict_expired(time.time())
+            if self._entries:
+                k = min(self._CANDIDATES, len(self._entries))
+                labels, distances = self._index.knn_query(embedding, k=k)
+                for label, distance in zip(labels[0], distances[0]):
+                    if distance >= self.threshold:
+                        break
+                    entry = self._entries.get(int(label))
+                    if (
+                        entry is not None
+                        and entry[0] == variant
+                        and (entities <= entry[1] or entry[1] <= entities)
+                    ):
+                        match = entry[3]
+                        break
+        if match is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(match)
+
+    def clear(self) -> None:
+        with self._lock:
+            for label in self._order:
+                self._index.mark_deleted(label)
+            self._entries.clear()
+            self._order.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def set(self, embedding, entities: Iterable[str], value: Dict, variant=None) -> None:
+        entities = frozenset(e.lower() for e in entities)
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            if len(self._order) >= self.max_entries:
+                # FIFO eviction
+                self._evict_oldest()
+            label = self._next_label
+            self._next_label += 1
+            # Reuses a deleted slot (eviction or clear()) when there is one
+            self._index.add_items(embedding, [label], replace_deleted=True)
+            self._entries[label] = (variant, entities, now + self.ttl_seconds, copy.deepcopy(value))
+            self._order.append(label)
@@ -1,11 +1,128 @@
 import os
-import requests
-from typing import Optional, Dict, List
-from dotenv import load_dotenv
+import copy
+import asyncio
+import functools
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from typing import Optional, Dict, List, Union
+from app.utils.env import load_env
 from datetime import datetime, timedelta
 import re
+import urllib.parse
+from app.utils.claim_features import ClaimFeatures, clear_feature_cache, to_features
+
+try:
+    # libxml2-backed parser; much faster than the pure-Python ElementTree
+    from lxml import etree as ET
+    # Feeds are untrusted input: no entity expansion, no network lookups
+    _XML_PARSER = ET.XMLParser(resolve_entities=False, no_network=True)
+except Exception:
+    import xml.etree.ElementTree as ET
+    _XML_PARSER = None
+
+try:
+    # Optional: pip install pyahocorasick
+    import ahocorasick
+except Exception:
+    ahocorasick = None
+
+load_env()
+
+# One pooled client for every provider and article fetch, so repeat requests
+# to the same host reuse a kept-alive TLS connection
+_HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30)
+_HTTP_RETRIES = 2  # connection-level retries (refused/reset), not HTTP status codes
+_HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/122.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Compressed feeds/pages; httpx decodes br only when brotli is installed
+try:
+    import brotli  # noqa: F401
+    _HTTP_HEADERS["Accept-Encoding"] = "gzip, deflate, br"
+except Exception:
+    _HTTP_HEADERS["Accept-Encoding"] = "gzip, deflate"
+
+# HTTP/2 (needs h2, from httpx[http2]) multiplexes same-host requests,
+# e.g. the RSS search and Google News redirect lookups, on one connection
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except Exception:
+    _HTTP2 = False
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def _build_matcher(keywords: List[str], text_words: set):
+    """
+    Returns match(article_text) -> (keyword matches, text-word matches),
+    counting patterns that occur as substrings of the text. With pyahocorasick
+    all patterns are found in one pass over the text.
+    """
+    patterns = set(keywords) | text_words
+    if ahocorasick is None or not patterns:
+        def match(article_text: str) -> tuple:
+            return (
+                sum(1 for kw in keywords if kw in article_text),
+                sum(1 for w in text_words if w in article_text),
+            )
+        return match
+
+    automaton = ahocorasick.Automaton()
+    for pattern in patterns:
+        automaton.add_word(pattern, pattern)
+    automaton.make_automaton()
+
+    def match(article_text: str) -> tuple:
+        found = {pattern for _, pattern in automaton.iter(article_text)}
+        return sum(1 for kw in keywords if kw in found), len(found & text_words)
+    return match
+
+
+# The few blocking steps left (SerpAPI's sync client, HTML parsing) get their
+# own pool so a slow provider cannot starve the app's default executor
+NEWS_THREAD_WORKERS = int(os.getenv('NEWS_THREAD_WORKERS', '8'))
+_BLOCKING_EXECUTOR = ThreadPoolExecutor(max_workers=NEWS_THREAD_WORKERS, thread_name_prefix="news")
+
+
+async def _run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_BLOCKING_EXECUTOR, functools.partial(func, *args))
+
+
+# Search results per (provider, normalised query); breaking news moves fast, so keep it short
+# TTLCache also evicts least-recently-used entries once full, so memory stays
+# bounded however many distinct queries arrive
+NEWS_CACHE_TTL_SECONDS = int(os.getenv('NEWS_CACHE_TTL_SECONDS', '900'))
+NEWS_CACHE_MAX_ENTRIES = int(os.getenv('NEWS_CACHE_MAX_ENTRIES', '1024'))
+
+# Paid providers (NewsAPI, SerpAPI) only join the search if free Google News RSS
+# finds nothing, or has not answered within this many seconds
+PAID_SEARCH_DELAY_SECONDS = float(os.getenv('PAID_SEARCH_DELAY_SECONDS', '1.5'))
+
+
+def _cache_search(method):
+    """Serve repeat searches for the same query from NewsValidator._search_cache."""
+    @functools.wraps(method)
+    async def wrapper(self, query: str, *args, **kwargs):
+        key = (method.__name__, query.lower().strip(), args, tuple(sorted(kwargs.items())))
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            # validate_claim annotates articles in place, so hand out copies
+            return copy.deepcopy(cached)
+        result = await method(self, query, *args, **kwargs)
+        if result is not None:
+            self._search_cache[key] = copy.deepcopy(result)
+        return result
+    return wrapper
 
-load_dotenv()
 
 class NewsValidator:
     """
@@ -18,60 +135,54 @@ class NewsValidator:
         self.serpapi_key = os.getenv('SERPAPI_KEY')
         # Always enabled because Google News RSS is free and doesn't need API key
         self.enabled = True
+        self._http: Optional[httpx.AsyncClient] = None
+        self._search_cache = TTLCache(maxsize=NEWS_CACHE_MAX_ENTRIES, ttl=NEWS_CACHE_TTL_SECONDS)
         
-    def extract_keywords(self, text: str) -> List[str]:
+    def clear_caches(self):
+        """Forget cached search results and claim tokenizations."""
+        self._search_cache.clear()
+        clear_feature_cache()
+
+    @staticmethod
+    def extract_keywords(claim: Union[str, ClaimFeatures]) -> List[str]:
         """Extract important keywords from text for searching"""
-        # Common stop words to filter out
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                      'of', 'with', 'is', 'are', 'was', 'were', 'been', 'be', 'have', 'has', 
-                      'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 
-                      'might', 'can', 'said', 'says', 'that', 'this', 'they', 'their', 'them',
-                      'there', 'these', 'those', 'what', 'which', 'when', 'where', 'who', 'whom',
-                      'how', 'why', 'just', 'only', 'even', 'also', 'very', 'most', 'some', 
-                      'many', 'much', 'more', 'other', 'than', 'then', 'now', 'here', 'such',
-                      'like', 'into', 'over', 'after', 'before', 'between', 'under', 'again',
-                      'about', 'being', 'once', 'during', 'each', 'because', 'through', 'while',
-                      'news', 'breaking', 'report', 'says', 'according', 'announced', 'claims',
-                      'article', 'story', 'sources', 'officials', 'people', 'percent', 'years'}
-        
-        # Extract words (including proper nouns with capitals)
-        words = re.findall(r'\b[A-Za-z]{3,}\b', text)
-        
-        # Prioritize capitalized words (likely proper nouns - names, places, organizations)
-        proper_nouns = [w for w in words if w[0].isupper() and w.lower() not in stop_words]
-        
-        # Get other important words
-        other_words = [w.lower() for w in words if w.lower() not in stop_words and not w[0].isupper()]
-        
-        # Combine: proper nouns first, then other words
-        keywords = proper_nouns[:4] + other_words[:3]
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_keywords = []
-        for k in keywords:
-            k_lower = k.lower()
-            if k_lower not in seen:
-                seen.add(k_lower)
-                unique_keywords.append(k)
-        
-        return unique_keywords[:6]
+        return list(to_features(claim).keywords)
     
-    def build_search_query(self, text: str) -> str:
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Shared async HTTP client, created on first use."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                headers=_HTTP_HEADERS,
+                transport=httpx.AsyncHTTPTransport(retries=_HTTP_RETRIES, limits=_HTTP_LIMITS, http2=_HTTP2),
+                timeout=10,
+            )
+        return self._http
+
+    async def aclose(self):
+        """Close pooled connections (called on app shutdown)."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    @classmethod
+    def build_search_query(cls, claim: Union[str, ClaimFeatures]) -> str:
         """Build an effective search query from the text"""
-        # Clean the text - remove extra whitespace
-        clean_text = ' '.join(text.split())
+        return cls._build_query_and_keywords(to_features(claim))[0]
+
+    @staticmethod
+    def _build_query_and_keywords(features: ClaimFeatures) -> tuple:
+        """Search query and keywords for a claim, from a single tokenization."""
+        clean_text = features.normalized
+        keywords = features.keywords
         
         # If text is short enough, use it directly (best for relevance)
         if len(clean_text) <= 150:
-            return clean_text
-        
-        # For longer text, extract the most important parts
-        keywords = self.extract_keywords(text)
+            return clean_text, keywords
         
         if not keywords:
             # Fallback: use first 100 chars
-            return clean_text[:100].strip()
+            return clean_text[:100].strip(), keywords
         
         # Build query with proper nouns quoted for exact matching
         query_parts = []
@@ -81,44 +192,40 @@ class NewsValidator:
             else:
                 query_parts.append(kw)
         
-        return ' '.join(query_parts)
+        return ' '.join(query_parts), keywords
     
-    def search_google_news_rss(self, query: str) -> Optional[Dict]:
+    @_cache_search
+    async def search_google_news_rss(self, query: str) -> Optional[Dict]:
         """Search Google News RSS feed for free, real-time results"""
         try:
-            import urllib.parse
-            
             # Google News RSS - free and always up-to-date
             encoded_query = urllib.parse.quote(query)
             url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
             
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
+            response = await self.http.get(url, timeout=10)
             
             if response.status_code == 200:
-                import xml.etree.ElementTree as ET
-                root = ET.fromstring(response.content)
+                root = ET.fromstring(response.content, _XML_PARSER)
                 
                 articles = []
-                for item in root.findall('.//item')[:10]:
-                    title = item.find('title')
-                    link = item.find('link')
-                    pub_date = item.find('pubDate')
-                    source = item.find('source')
+                for i, item in enumerate(root.iterfind('.//item')):
+                    if i == 10:
+                        break
+                    title = item.findtext('title')
+                    link = item.findtext('link')
                     
                     if title is not None and link is not None:
                         # Extract and clean the RSS <description> element (contains HTML snippet)
-                        description_elem = item.find('description')
+                        description = item.findtext('description')
                         desc_text = ""
-                        if description_elem is not None and description_elem.text:
-                            desc_text = re.sub(r'<[^>]+>', '', description_elem.text).strip()[:300]
+                        if description:
+                            desc_text = _HTML_TAG_RE.sub('', description).strip()[:300]
                         articles.append({
-                            'title': title.text,
-                            'url': link.text,
-                            'source': source.text if source is not None else 'Google News',
-                            'published_at': pub_date.text if pub_date is not None else None,
-                            'description': desc_text or (title.text[:200] if title.text else '')
+                            'title': title,
+                            'url': link,
+                            'source': item.findtext('source', 'Google News'),
+                            'published_at': item.findtext('pubDate'),
+                            'description': desc_text or title[:200]
                         })
                 
                 return {
@@ -130,7 +237,8 @@ class NewsValidator:
             print(f"Google News RSS error: {e}")
             return None
     
-    def search_newsapi(self, query: str, days: int = 7) -> Optional[Dict]:
+    @_cache_search
+    async def search_newsapi(self, query: str, days: int = 7) -> Optional[Dict]:
         """Search NewsAPI for relevant articles"""
         if not self.newsapi_key or self.newsapi_key == 'your_newsapi_key_here':
             return None
@@ -148,7 +256,7 @@ class NewsValidator:
                 'apiKey': self.newsapi_key
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.http.get(url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -174,7 +282,8 @@ class NewsValidator:
             print(f"NewsAPI error: {e}")
             return None
     
-    def search_serpapi(self, query: str) -> Optional[Dict]:
+    @_cache_search
+    async def search_serpapi(self, query: str) -> Optional[Dict]:
         """Search Google News using SerpAPI"""
         if not self.serpapi_key or self.serpapi_key == 'your_serpapi_key_here':
             return None
@@ -189,7 +298,8 @@ class NewsValidator:
                 "num": 10
             }
             
-            results = serpapi.search(params)
+            # The serpapi client is synchronous; keep it off the event loop
+            results = await _run_blocking(serpapi.search, params)
             
             news_results = results.get('news_results', [])
             
@@ -210,7 +320,55 @@ class NewsValidator:
             print(f"SerpAPI error: {e}")
             return None
 
-    def fetch_article_snippet(self, url: str, max_chars: int = 600) -> str:
+    async def _search_all(self, query: str) -> Optional[Dict]:
+        """
+        Hedged search: Google News RSS starts first; NewsAPI and SerpAPI are
+        started only if it comes back empty or takes longer than
+        PAID_SEARCH_DELAY_SECONDS, so paid quota is spent only when needed.
+        Returns the first non-empty result, cancelling the searches still in
+        flight, or None if all come back empty.
+        """
+        google = asyncio.ensure_future(self.search_google_news_rss(query))
+        pending = [google]
+        try:
+            done, _ = await asyncio.wait(pending, timeout=PAID_SEARCH_DELAY_SECONDS)
+            if done:
+                news_results = google.result()
+                if news_results and news_results.get('total_results', 0) > 0:
+                    return news_results
+                pending = []
+            pending += [
+                asyncio.ensure_future(self.search_newsapi(query, days=7)),
+                asyncio.ensure_future(self.search_serpapi(query)),
+            ]
+            for next_done in asyncio.as_completed(pending):
+                news_results = await next_done
+                if news_results and news_results.get('total_results', 0) > 0:
+                    return news_results
+            return None
+        finally:
+            google.cancel()
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _extract_snippet(html: str, max_chars: int) -> str:
+        """Pull the opening paragraphs out of an article page."""
+        from bs4 import BeautifulSoup
+
+        # Many paywalled sites return thin HTML but some text still leaks
+        soup = BeautifulSoup(html, "html.parser")
+        for tag in soup(["script", "style", "nav", "header", "footer", "aside", "figure"]):
+            tag.decompose()
+        paragraphs = [
+            p.get_text(" ", strip=True)
+            for p in soup.find_all("p")
+            if len(p.get_text(strip=True)) > 60
+        ]
+        snippet = " ".join(paragraphs[:6])
+        return snippet[:max_chars].strip()
+
+    async def fetch_article_snippet(self, url: str, max_chars: int = 600) -> str:
         """
         Fetch the opening paragraphs of an article URL so Gemini gets
         real content, not just the headline.
@@ -222,53 +380,32 @@ class NewsValidator:
         if not url or not url.startswith("http"):
             return ""
         try:
-            from bs4 import BeautifulSoup
-
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/122.0.0.0 Safari/537.36"
-                ),
-                "Accept": "text/html,application/xhtml+xml,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-            }
-
             # Google News RSS returns redirect URLs — resolve them first
             if "news.google.com" in url:
                 try:
-                    head = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
-                    resolved = head.url
+                    head = await self.http.head(url, timeout=5, follow_redirects=True)
+                    resolved = str(head.url)
                     if resolved and resolved != url and "news.google.com" not in resolved:
                         url = resolved
                 except Exception:
                     pass  # keep original URL and attempt anyway
 
-            resp = requests.get(url, headers=headers, timeout=7, allow_redirects=True)
+            resp = await self.http.get(url, timeout=7, follow_redirects=True)
             if resp.status_code != 200:
                 return ""
 
-            # Many paywalled sites return thin HTML but some text still leaks
-            soup = BeautifulSoup(resp.text, "html.parser")
-            for tag in soup(["script", "style", "nav", "header", "footer", "aside", "figure"]):
-                tag.decompose()
-            paragraphs = [
-                p.get_text(" ", strip=True)
-                for p in soup.find_all("p")
-                if len(p.get_text(strip=True)) > 60
-            ]
-            snippet = " ".join(paragraphs[:6])
-            return snippet[:max_chars].strip()
+            # HTML parsing is CPU-bound; run it in a worker thread
+            return await _run_blocking(self._extract_snippet, resp.text, max_chars)
 
         except Exception:
             return ""
 
-    def validate_claim(self, text: str) -> Optional[Dict]:
+    async def validate_claim(self, claim: Union[str, ClaimFeatures]) -> Optional[Dict]:
         """
         Validate a claim against real news sources
         
         Args:
-            text: The claim to validate
+            claim: The claim to validate (text or precomputed ClaimFeatures)
             
         Returns:
             Dict with validation results or None if no API available
@@ -277,40 +414,18 @@ class NewsValidator:
             return None
         
         # Build search query from user's full input
-        query = self.build_search_query(text)
-        keywords = self.extract_keywords(text)
+        features = to_features(claim)
+        query, keywords = self._build_query_and_keywords(features)
         
+        # Google News RSS, NewsAPI and SerpAPI are independent — query them together
         print(f"🔍 Searching news with query: {query[:100]}...")
+        news_results = await self._search_all(query)
         
-        # Try Google News RSS first (free, real-time, most relevant)
-        print(f"🔍 Searching Google News with query: {query[:80]}...")
-        news_results = self.search_google_news_rss(query)
-        
-        # If no results, try with keywords only
-        if not news_results or news_results.get('total_results', 0) == 0:
-            keyword_query = ' '.join(keywords[:4]) if keywords else query[:50]
-            print(f"🔍 Retry Google News with keywords: {keyword_query}")
-            news_results = self.search_google_news_rss(keyword_query)
-        
-        # If Google News fails, try NewsAPI
-        if not news_results or news_results.get('total_results', 0) == 0:
-            print("🔍 Trying NewsAPI...")
-            news_results = self.search_newsapi(query, days=7)
-        
-        # If NewsAPI no results, try with keywords
-        if not news_results or news_results.get('total_results', 0) == 0:
-            keyword_query = ' '.join(keywords[:4]) if keywords else query[:50]
-            news_results = self.search_newsapi(keyword_query, days=7)
-        
-        # If NewsAPI fails, try SerpAPI
-        if not news_results or news_results.get('total_results', 0) == 0:
-            print("🔍 Trying SerpAPI...")
-            news_results = self.search_serpapi(query)
-        
-        # If still no results, try SerpAPI with keywords
-        if not news_results or news_results.get('total_results', 0) == 0:
+        # If no provider had results, retry all of them with keywords only
+        if not news_results:
             keyword_query = ' '.join(keywords[:4]) if keywords else query[:50]
-            news_results = self.search_serpapi(keyword_query)
+            print(f"🔍 Retry news search with keywords: {keyword_query}")
+            news_results = await self._search_all(keyword_query)
         
         if not news_results:
             return {
@@ -334,22 +449,16 @@ class NewsValidator:
         relevant_articles = []
         
         # Also check for words from the original text
-        text_words = set(word.lower() for word in text.split() if len(word) > 4)
+        text_words = features.long_words
+        kw_lowers = [keyword.lower() for keyword in keywords[:5]]
+        match = _build_matcher(kw_lowers, text_words)
         
         for article in articles:
-            title = article.get('title', '').lower()
-            desc = article.get('description', '').lower() if article.get('description') else ''
-            article_text = title + ' ' + desc
-            
-            # Check if keywords appear in article
-            keyword_matches = 0
-            for keyword in keywords[:5]:
-                kw_lower = keyword.lower()
-                if kw_lower in article_text:
-                    keyword_matches += 1
+            # Lowercase title + description once per article
+            article_text = f"{article.get('title') or ''} {article.get('description') or ''}".lower()
             
-            # Also check for common words from original text
-            text_matches = sum(1 for w in text_words if w in article_text)
+            # Count keywords, and common words from the original text, appearing in the article
+            keyword_matches, text_matches = match(article_text)
             
             # Consider relevant if keyword match or significant text overlap
             if keyword_matches >= 1 or text_matches >= 3:
@@ -366,16 +475,18 @@ class NewsValidator:
             articles = relevant_articles + other_articles
 
         # ── Fetch real article body snippets for Gemini context ──────────────
-        # Only fetch for the top 3 to keep response time reasonable
-        print(f"📰 Fetching article snippets for top {min(3, len(articles))} articles...")
-        for art in articles[:3]:
-            url = art.get('url', '')
-            if url:
-                art['fetched_snippet'] = self.fetch_article_snippet(url)
-                if art['fetched_snippet']:
-                    print(f"   ✓ Fetched snippet from {art.get('source','?')} ({len(art['fetched_snippet'])} chars)")
-                else:
-                    print(f"   ✗ Could not fetch snippet from {url[:60]}")
+        # Only fetch for the top 3 to keep response time reasonable; fetched concurrently
+        top_articles = [art for art in articles[:3] if art.get('url')]
+        print(f"📰 Fetching article snippets for top {len(top_articles)} articles...")
+        snippets = await asyncio.gather(
+            *(self.fetch_article_snippet(art['url']) for art in top_articles)
+        )
+        for art, snippet in zip(top_articles, snippets):
+            art['fetched_snippet'] = snippet
+            if snippet:
+                print(f"   ✓ Fetched snippet from {art.get('source','?')} ({len(snippet)} chars)")
+            else:
+                print(f"   ✗ Could not fetch snippet from {art['url'][:60]}")
         
         # Calculate confidence based on findings
         if total_articles == 0: